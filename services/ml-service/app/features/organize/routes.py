@@ -1,11 +1,14 @@
+import asyncio
 import logging
 import time
+from collections import Counter
+import numpy as np
 from fastapi import APIRouter, HTTPException
 from app.features.organize.schemas.extract import ExtractRequest, ExtractResponse
 from app.features.organize.services.entity_extractor import extract_entities_with_gemini
-from app.features.organize.services.embedding_service import EmbeddingService
+from app.features.organize.services.embedding_service import get_embedding_service
 from app.features.organize.services.deduplication_engine import deduplicate_entities
-from app.features.organize.services.relationship_classifier import RelationshipClassifier
+from app.features.organize.services.relationship_classifier import get_relationship_classifier
 
 from app.shared.utils.gemini_client import GeminiClient
 
@@ -33,7 +36,7 @@ async def extract_graph(request: ExtractRequest):
         # Stage 1: Extract entities using hybrid approach (spaCy + Gemini)
         stage_start = time.time()
         logger.info("[STAGE 1] Entity extraction - Gemini ENABLED")
-        entities = extract_entities_with_gemini(
+        entities = await extract_entities_with_gemini(
             request.textChunks, 
             request.docId,
             use_gemini=True  # Re-enabled with correct model
@@ -44,18 +47,29 @@ async def extract_graph(request: ExtractRequest):
         logger.info(f"Extracted {len(entities)} entities (before deduplication) for docId: {request.docId}")
         
         # Stage 2: Generate embeddings for entities
+        # Entities that are alone in their type can never merge, so skip them.
+        # The blocking API calls run in a worker thread so the event loop keeps
+        # serving other requests meanwhile.
         stage_start = time.time()
-        embedding_service = EmbeddingService()
-        entity_names = [entity.name for entity in entities]
-        embeddings = embedding_service.generate_embeddings(entity_names)
+        embedding_service = get_embedding_service()
+        type_counts = Counter(entity.type for entity in entities)
+        needs_embedding = [i for i, entity in enumerate(entities) if type_counts[entity.type] > 1]
+        subset_embeddings, subset_mask = await asyncio.to_thread(
+            embedding_service.generate_embedding_matrix,
+            [entities[i].name for i in needs_embedding]
+        )
+        embeddings = np.zeros((len(entities), subset_embeddings.shape[1]), dtype=np.float32)
+        embedding_mask = np.zeros(len(entities), dtype=bool)
+        embeddings[needs_embedding] = subset_embeddings
+        embedding_mask[needs_embedding] = subset_mask
         stage_duration = (time.time() - stage_start) * 1000
         
-        successful_embeddings = sum(1 for emb in embeddings if emb is not None)
-        logger.info(f"Stage 2 (Embeddings): {successful_embeddings}/{len(entities)} successful in {stage_duration:.0f}ms")
+        successful_embeddings = int(embedding_mask.sum())
+        logger.info(f"Stage 2 (Embeddings): {successful_embeddings}/{len(needs_embedding)} successful ({len(entities) - len(needs_embedding)} singletons skipped) in {stage_duration:.0f}ms")
         
         # Stage 3: Deduplicate entities using multi-signal matching
         stage_start = time.time()
-        deduplicated_entities = deduplicate_entities(entities, embeddings)
+        deduplicated_entities = deduplicate_entities(entities, embeddings, embedding_mask)
         stage_duration = (time.time() - stage_start) * 1000
         
         merged_count = len(entities) - len(deduplicated_entities)
@@ -63,7 +77,7 @@ async def extract_graph(request: ExtractRequest):
         
         # Stage 4: Build relationships using co-occurrence
         stage_start = time.time()
-        relationship_classifier = RelationshipClassifier()
+        relationship_classifier = get_relationship_classifier()
         relationships = relationship_classifier.build_cooccurrence_relationships(
             request.textChunks,
             deduplicated_entities,
@@ -88,12 +102,12 @@ async def extract_graph(request: ExtractRequest):
         # Initialize Gemini client for relationship classification
         gemini_client = GeminiClient()
         
-        # Classify top relationships with Gemini (reduced delay to prevent timeout)
-        classified_relationships = relationship_classifier.classify_relationships_with_llm(
+        # Classify top relationships with Gemini concurrently
+        classified_relationships = await relationship_classifier.classify_relationships_with_llm_async(
             top_relationships,
             gemini_client,
             deduplicated_entities,  # Pass entities for type lookup
-            delay_ms=100  # Reduced from 500ms to prevent timeout
+            delay_ms=100  # Spacing between API call starts to respect the rate limit
         )
         
         # Combine classified and remaining (unclassified) relationships
@@ -1,9 +1,15 @@
 import logging
-from typing import List, Optional, Dict
+from collections import defaultdict
+from typing import List, Optional, Dict, Set, Tuple, Union
+import numpy as np
+from rapidfuzz import fuzz, process
 from app.features.organize.schemas.extract import ExtractedEntity
 from app.shared.utils.similarity import (
+    normalize_text,
+    initials_of,
     string_similarity,
     cosine_similarity,
+    build_embedding_matrix,
     is_abbreviation
 )
 
@@ -13,11 +19,22 @@ logger = logging.getLogger(__name__)
 STRING_SIMILARITY_THRESHOLD = 0.85
 COSINE_SIMILARITY_THRESHOLD = 0.90
 
+# Unit-length embeddings are quantized to int8 (component * 127) for the
+# cosine screening pass, which is applied to the integer dot products
+INT8_SCALE = 127
+
+
+# Names up to this (normalized) length may be abbreviations (see is_abbreviation)
+ABBREVIATION_MAX_LENGTH = 5
+
 def should_merge(
     entity1: ExtractedEntity,
     entity2: ExtractedEntity,
     emb1: Optional[List[float]],
-    emb2: Optional[List[float]]
+    emb2: Optional[List[float]],
+    cosine: Optional[float] = None,
+    string_score: Optional[float] = None,
+    abbreviation: Optional[bool] = None
 ) -> bool:
     """
     Determine if two entities should be merged based on multi-signal matching.
@@ -34,6 +51,12 @@ def should_merge(
         entity2: Second entity.
         emb1: Embedding for entity1 (None if not available).
         emb2: Embedding for entity2 (None if not available).
+        cosine: Precomputed cosine similarity of the embeddings. When given,
+            it is used instead of computing it from emb1/emb2.
+        string_score: Precomputed string similarity (0.0-1.0) of the names.
+            When given, it is used instead of calling string_similarity.
+        abbreviation: Precomputed abbreviation check (either direction).
+            When given, it is used instead of calling is_abbreviation.
         
     Returns:
         True if entities should be merged, False otherwise.
@@ -44,39 +67,261 @@ def should_merge(
     
     # Rule 2: Check similarity signals
     
-    # Signal 1: String similarity
-    str_sim = string_similarity(entity1.name, entity2.name)
+    # Identical names are a perfect string match (no similarity to compute)
+    if entity1.name == entity2.name:
+        logger.debug(f"Merge '{entity1.name}' and '{entity2.name}': identical names")
+        return True
+    
+    # Signal 1: String similarity (bounded by the threshold, so the edit
+    # distance of dissimilar names is abandoned early)
+    str_sim = string_score if string_score is not None else string_similarity(
+        entity1.name, entity2.name, score_cutoff=STRING_SIMILARITY_THRESHOLD
+    )
     if str_sim >= STRING_SIMILARITY_THRESHOLD:
         logger.debug(f"Merge '{entity1.name}' and '{entity2.name}': string similarity {str_sim:.2f}")
         return True
     
     # Signal 2: Semantic similarity (only if BOTH have embeddings)
-    if emb1 is not None and emb2 is not None:
+    if cosine is None and emb1 is not None and emb2 is not None:
         try:
-            cos_sim = cosine_similarity(emb1, emb2)
-            if cos_sim >= COSINE_SIMILARITY_THRESHOLD:
-                logger.debug(f"Merge '{entity1.name}' and '{entity2.name}': cosine similarity {cos_sim:.2f}")
-                return True
+            cosine = cosine_similarity(emb1, emb2)
         except ValueError as e:
             logger.warning(f"Failed to compute cosine similarity: {e}")
     
+    if cosine is not None and cosine >= COSINE_SIMILARITY_THRESHOLD:
+        logger.debug(f"Merge '{entity1.name}' and '{entity2.name}': cosine similarity {cosine:.2f}")
+        return True
+    
     # Signal 3: Abbreviation detection
-    if is_abbreviation(entity1.name, entity2.name) or is_abbreviation(entity2.name, entity1.name):
+    if abbreviation is None:
+        abbreviation = is_abbreviation(entity1.name, entity2.name) or is_abbreviation(entity2.name, entity1.name)
+    if abbreviation:
         logger.debug(f"Merge '{entity1.name}' and '{entity2.name}': abbreviation detected")
         return True
     
     return False
 
+def _similar_name_pairs(
+    normalized: List[str],
+    indices: List[int]
+) -> Dict[Tuple[int, int], float]:
+    """
+    Find the pairs of a type group whose names pass the string similarity threshold.
+    
+    Uses RapidFuzz cdist to score every pair of normalized names in native
+    code (scores below the cutoff come back as 0).
+    
+    Args:
+        normalized: Normalized names, parallel to entities.
+        indices: Indices of the entities in this type group.
+        
+    Returns:
+        Dictionary mapping (i, j) index pairs (i < j) to their similarity (0.0-1.0).
+    """
+    names = [normalized[idx] for idx in indices]
+    cutoff = STRING_SIMILARITY_THRESHOLD * 100
+    scores = process.cdist(names, names, scorer=fuzz.ratio, score_cutoff=cutoff, workers=-1)
+    
+    similar: Dict[Tuple[int, int], float] = {}
+    rows, cols = np.nonzero(np.triu(scores >= cutoff, k=1))
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        similar[(indices[row], indices[col])] = float(scores[row, col]) / 100
+    
+    return similar
+
+def _embedding_matrix(
+    embeddings: Union[List[Optional[List[float]]], np.ndarray],
+    embedding_mask: Optional[np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bring embeddings into (matrix, mask) form with L2-normalized float32 rows.
+    
+    Args:
+        embeddings: Either a list of embeddings (None if not available) or a
+            float32 matrix with one row per entity.
+        embedding_mask: Rows of the matrix that hold an embedding (all rows
+            if not given). Ignored for list input.
+        
+    Returns:
+        Tuple of (normalized matrix, boolean mask). List entries that are
+        missing, empty or of a different dimension than the first embedding
+        are masked out.
+    """
+    if isinstance(embeddings, np.ndarray):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        mask = np.ones(len(matrix), dtype=bool) if embedding_mask is None else np.asarray(embedding_mask, dtype=bool)
+    else:
+        dimensions = next((len(emb) for emb in embeddings if emb is not None and len(emb) > 0), 0)
+        matrix = np.zeros((len(embeddings), dimensions), dtype=np.float32)
+        mask = np.zeros(len(embeddings), dtype=bool)
+        for i, emb in enumerate(embeddings):
+            if emb is None or len(emb) == 0:
+                continue
+            if len(emb) != dimensions:
+                logger.warning(f"Ignoring embedding {i}: {len(emb)} dimensions (expected {dimensions})")
+                continue
+            matrix[i] = emb
+            mask[i] = True
+    
+    return build_embedding_matrix(matrix), mask
+
+def _quantize(matrix: np.ndarray) -> np.ndarray:
+    """
+    Quantize an L2-normalized float matrix to int8 (component * INT8_SCALE).
+    
+    Args:
+        matrix: Matrix with unit-length (or zero) rows.
+        
+    Returns:
+        int8 matrix of the same shape.
+    """
+    return np.clip(np.round(matrix * INT8_SCALE), -INT8_SCALE, INT8_SCALE).astype(np.int8)
+
+def _similar_embedding_pairs(
+    indices: List[int],
+    matrix: np.ndarray,
+    quantized: np.ndarray,
+    mask: np.ndarray
+) -> Dict[Tuple[int, int], float]:
+    """
+    Find the embedded pairs of a type group whose cosine similarity passes the threshold.
+    
+    The group's rows are compared with a single matmul (Q @ Q.T) instead of
+    per-pair Python loops, and screened on the integer dot products. For unit
+    rows a, b with quantization errors d_a, d_b (row / INT8_SCALE - a), the
+    screened cosine is off by at most |d_a| + |d_b| + |d_a| * |d_b|
+    (Cauchy-Schwarz). Pairs whose screened cosine is within that bound of the
+    threshold are decided on their float32 cosine, so quantization never
+    flips a merge decision.
+    
+    Args:
+        indices: Indices of the entities in this type group.
+        matrix: L2-normalized float32 embedding matrix.
+        quantized: int8 embedding matrix (see _quantize).
+        mask: Rows of the matrix that hold an embedding.
+        
+    Returns:
+        Dictionary mapping (i, j) index pairs (i < j) to their cosine
+        similarity (exact for borderline pairs, approximate otherwise).
+    """
+    embedded = [idx for idx in indices if mask[idx]]
+    
+    similar: Dict[Tuple[int, int], float] = {}
+    if len(embedded) < 2:
+        return similar
+    
+    # NumPy has no int8 GEMM, so multiply in float32 BLAS: up to 1040
+    # dimensions every partial sum is an integer below 2**24, i.e. exact
+    group = quantized[embedded].astype(np.float32)
+    dots = group @ group.T
+    
+    # Per-row quantization error, and the largest cosine error it allows
+    errors = np.linalg.norm(group / INT8_SCALE - matrix[embedded], axis=1).astype(np.float64)
+    max_bound = 2 * errors.max() + errors.max() ** 2
+    screen = (COSINE_SIMILARITY_THRESHOLD - max_bound) * INT8_SCALE * INT8_SCALE
+    rows, cols = np.nonzero(np.triu(dots >= screen, k=1))
+    approx = dots[rows, cols].astype(np.float64) / (INT8_SCALE * INT8_SCALE)
+    bound = errors[rows] + errors[cols] + errors[rows] * errors[cols]
+    
+    # Pairs that cannot pass even at the bound are dropped; exact float32
+    # cosine for the borderline pairs only
+    keep = approx + bound >= COSINE_SIMILARITY_THRESHOLD
+    rows, cols, approx, bound = rows[keep], cols[keep], approx[keep], bound[keep]
+    borderline = approx - bound < COSINE_SIMILARITY_THRESHOLD
+    if borderline.any():
+        left = matrix[[embedded[r] for r in rows[borderline].tolist()]]
+        right = matrix[[embedded[c] for c in cols[borderline].tolist()]]
+        approx[borderline] = np.einsum("ij,ij->i", left, right)
+    
+    for row, col, cosine in zip(rows.tolist(), cols.tolist(), approx.tolist()):
+        if cosine >= COSINE_SIMILARITY_THRESHOLD:
+            similar[(embedded[row], embedded[col])] = cosine
+    
+    return similar
+
+def _abbreviation_pairs(
+    normalized: List[str],
+    initials: List[str],
+    indices: List[int]
+) -> Set[Tuple[int, int]]:
+    """
+    Find the pairs of a type group where one name is an abbreviation of the other.
+    
+    Only names up to ABBREVIATION_MAX_LENGTH can be abbreviations. Each is
+    matched against the group by substring, and against an index of the
+    group's initials (blocking on the acronym), so pairs that are not
+    abbreviations never reach the per-pair merge check.
+    
+    Args:
+        normalized: Normalized names, parallel to entities.
+        initials: initials_of each normalized name, parallel to entities.
+        indices: Indices of the entities in this type group.
+        
+    Returns:
+        Set of (i, j) index pairs (i < j) for which is_normalized_abbreviation
+        holds in either direction.
+    """
+    by_initials: Dict[str, List[int]] = defaultdict(list)
+    for idx in indices:
+        if initials[idx]:
+            by_initials[initials[idx]].append(idx)
+    
+    pairs: Set[Tuple[int, int]] = set()
+    for short_idx in indices:
+        short = normalized[short_idx]
+        if len(short) > ABBREVIATION_MAX_LENGTH:
+            continue
+        
+        # Pattern 1: substring, Pattern 2: initials (see is_normalized_abbreviation)
+        matches = [idx for idx in indices if short in normalized[idx]]
+        matches.extend(by_initials.get(short, ()))
+        for idx in matches:
+            if idx != short_idx:
+                pairs.add((min(short_idx, idx), max(short_idx, idx)))
+    
+    return pairs
+
+def _candidate_pairs(
+    similar_names: Dict[Tuple[int, int], float],
+    abbreviations: Set[Tuple[int, int]],
+    similar_embeddings: Dict[Tuple[int, int], float]
+) -> List[Tuple[int, int]]:
+    """
+    Generate the pairs within one type group that can possibly merge.
+    
+    A pair is a candidate if ANY of the following holds:
+    1. The names pass the string similarity threshold
+    2. One of the names is an abbreviation of the other
+    3. The embeddings pass the cosine similarity threshold
+    
+    These are exactly the signals should_merge accepts, so restricting
+    the scan to candidates does not change the result.
+    
+    Args:
+        similar_names: Output of _similar_name_pairs for this group.
+        abbreviations: Output of _abbreviation_pairs for this group.
+        similar_embeddings: Output of _similar_embedding_pairs for this group.
+        
+    Returns:
+        Sorted list of (i, j) index pairs with i < j.
+    """
+    candidates: Set[Tuple[int, int]] = set(similar_names)
+    candidates.update(abbreviations)
+    candidates.update(similar_embeddings)
+    
+    return sorted(candidates)
+
 def deduplicate_entities(
     entities: List[ExtractedEntity],
-    embeddings: List[Optional[List[float]]]
+    embeddings: Union[List[Optional[List[float]]], np.ndarray],
+    embedding_mask: Optional[np.ndarray] = None
 ) -> List[ExtractedEntity]:
     """
     Deduplicate entities using multi-signal matching.
     
     Strategy:
     1. Group entities by type for efficiency
-    2. Within each type, compare all pairs
+    2. Within each type, compare candidate pairs (see _candidate_pairs)
     3. Merge entities that match criteria
     4. Keep first occurrence as canonical
     5. Add variants to aliases
@@ -85,7 +330,10 @@ def deduplicate_entities(
     
     Args:
         entities: List of extracted entities.
-        embeddings: List of embeddings (parallel to entities, None if not available).
+        embeddings: Embeddings parallel to entities, either as a list (None if
+            not available) or as a float32 matrix with one row per entity.
+        embedding_mask: For matrix input, the rows that hold an embedding
+            (see EmbeddingService.generate_embedding_matrix).
         
     Returns:
         Deduplicated list of entities with aliases populated.
@@ -97,63 +345,66 @@ def deduplicate_entities(
         return []
     
     # Group entities by type for efficiency
-    type_groups: Dict[str, List[int]] = {}
+    type_groups: Dict[str, List[int]] = defaultdict(list)
     for i, entity in enumerate(entities):
-        if entity.type not in type_groups:
-            type_groups[entity.type] = []
         type_groups[entity.type].append(i)
     
+    # Normalize each name (and take its initials) once, not once per pair
+    normalized = [normalize_text(entity.name) for entity in entities]
+    initials = [initials_of(name) for name in normalized]
+    
+    # Normalize and quantize all embeddings once
+    matrix, mask = _embedding_matrix(embeddings, embedding_mask)
+    quantized = _quantize(matrix)
+    
     # Track which entities have been merged (index -> canonical index)
     merge_map: Dict[int, int] = {}
     
     # Process each type group
     for entity_type, indices in type_groups.items():
-        # Compare all pairs within this type
-        for i in range(len(indices)):
-            idx_i = indices[i]
-            
+        # String and cosine similarities for the whole group in one pass each
+        similar_names = _similar_name_pairs(normalized, indices)
+        similar_embeddings = _similar_embedding_pairs(indices, matrix, quantized, mask)
+        abbreviations = _abbreviation_pairs(normalized, initials, indices)
+        
+        # Candidates come in (i, j) order, so this is the same pass as the
+        # full pairwise loop: an entity that was merged is neither a
+        # canonical nor merged again, so matches never chain
+        candidates = _candidate_pairs(similar_names, abbreviations, similar_embeddings)
+        for idx_i, idx_j in candidates:
             # Skip if already merged
-            if idx_i in merge_map:
+            if idx_i in merge_map or idx_j in merge_map:
                 continue
             
-            for j in range(i + 1, len(indices)):
-                idx_j = indices[j]
-                
-                # Skip if already merged
-                if idx_j in merge_map:
-                    continue
-                
-                # Check if should merge
-                if should_merge(
-                    entities[idx_i],
-                    entities[idx_j],
-                    embeddings[idx_i],
-                    embeddings[idx_j]
-                ):
-                    # Merge idx_j into idx_i (keep first as canonical)
-                    merge_map[idx_j] = idx_i
+            # Check if should merge (pairs missing from the similarity lookups
+            # are below the thresholds, so no raw inputs are handed over)
+            if should_merge(
+                entities[idx_i],
+                entities[idx_j],
+                None,
+                None,
+                cosine=similar_embeddings.get((idx_i, idx_j)),
+                string_score=similar_names.get((idx_i, idx_j), 0.0),
+                abbreviation=(idx_i, idx_j) in abbreviations
+            ):
+                # Merge idx_j into idx_i (keep first as canonical)
+                merge_map[idx_j] = idx_i
+    
+    # Bucket indices by canonical index (ascending, so the first index of
+    # each cluster is its first occurrence)
+    clusters: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(entities)):
+        clusters[merge_map.get(i, i)].append(i)
     
     # Build deduplicated entities
     deduplicated: List[ExtractedEntity] = []
-    processed: set = set()
     
-    for i, entity in enumerate(entities):
-        # Skip if this entity was merged into another
-        if i in merge_map:
-            continue
-        
-        # Skip if already processed
-        if i in processed:
-            continue
-        
-        # Find all entities merged into this one
-        merged_indices = [i]
-        for j, canonical_idx in merge_map.items():
-            if canonical_idx == i:
-                merged_indices.append(j)
+    for merged_indices in clusters.values():
+        entity = entities[merged_indices[0]]
         
-        # Create canonical entity
-        canonical = ExtractedEntity(
+        # Create canonical entity (from an already validated entity, so
+        # skip re-validating it and its sources)
+        canonical = ExtractedEntity.model_construct(
             name=entity.name,
             type=entity.type,
             confidence=entity.confidence,
@@ -161,17 +412,19 @@ def deduplicate_entities(
             aliases=entity.aliases.copy()
         )
         
-        # Merge all variants
+        # Merge all variants (sets mirror the lists for O(1) duplicate checks)
         confidences = [entity.confidence]
+        existing_aliases = set(canonical.aliases)
+        existing_snippets = {s.snippet for s in canonical.sources}
         for idx in merged_indices[1:]:  # Skip first (canonical)
             merged_entity = entities[idx]
             
             # Add name as alias if not already present
-            if merged_entity.name != canonical.name and merged_entity.name not in canonical.aliases:
+            if merged_entity.name != canonical.name and merged_entity.name not in existing_aliases:
                 canonical.aliases.append(merged_entity.name)
+                existing_aliases.add(merged_entity.name)
             
             # Merge sources (avoid duplicates)
-            existing_snippets = {s.snippet for s in canonical.sources}
             for source in merged_entity.sources:
                 if source.snippet not in existing_snippets:
                     canonical.sources.append(source)
@@ -182,14 +435,14 @@ def deduplicate_entities(
             
             # Merge aliases from merged entity
             for alias in merged_entity.aliases:
-                if alias not in canonical.aliases and alias != canonical.name:
+                if alias not in existing_aliases and alias != canonical.name:
                     canonical.aliases.append(alias)
+                    existing_aliases.add(alias)
         
         # Average confidence scores
         canonical.confidence = sum(confidences) / len(confidences)
         
         deduplicated.append(canonical)
-        processed.add(i)
     
     logger.info(f"Deduplication: {len(entities)} entities → {len(deduplicated)} deduplicated ({len(entities) - len(deduplicated)} merged)")
     
@@ -1,5 +1,11 @@
+import hashlib
 import logging
-from typing import List, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 import google.generativeai as genai
 from app.shared.utils.gemini_client import GeminiClient
 
@@ -12,7 +18,11 @@ class EmbeddingService:
     """
     
     EMBEDDING_MODEL = "models/text-embedding-004"
-    BATCH_SIZE = 10
+    # Gemini accepts up to 100 texts per batch embedding request
+    BATCH_SIZE = 100
+    MAX_CONCURRENT_BATCHES = 5
+    # A full cache of 768-d float32 vectors takes about 150 MB
+    CACHE_SIZE = 50000
     EMBEDDING_DIMENSIONS = 768
     
     def __init__(self):
@@ -20,71 +30,168 @@ class EmbeddingService:
         self.client = GeminiClient()
         if not self.client.model:
             logger.warning("Gemini client not initialized. Embeddings will fail.")
+        
+        # LRU cache of _cache_key(text) -> float32 embedding (only successful embeddings are stored).
+        # Kept at full precision, so a cache hit returns exactly what a fresh request does.
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        # The service is shared, and requests call it from worker threads
+        self._cache_lock = threading.Lock()
     
     def generate_embeddings(self, texts: List[str]) -> List[Optional[List[float]]]:
         """
         Generate embeddings for a list of texts.
         
+        List form of generate_embedding_matrix.
+        
+        Args:
+            texts: List of text strings to embed.
+            
+        Returns:
+            List of unit-length embedding vectors (or None if failed), in input order.
+        """
+        matrix, mask = self.generate_embedding_matrix(texts)
+        return [row.tolist() if valid else None for row, valid in zip(matrix, mask)]
+    
+    def generate_embedding_matrix(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Generate embeddings for a list of texts as one float32 matrix.
+        
+        Cached and repeated texts are embedded only once. The remaining
+        texts are sorted by length before batching so each batch holds
+        similarly sized inputs, and batches are sent concurrently.
+        
         Args:
             texts: List of text strings to embed.
             
         Returns:
-            List of embedding vectors (or None if failed).
+            Tuple of (matrix, mask): a (len(texts), EMBEDDING_DIMENSIONS)
+            float32 matrix of L2-normalized rows in input order, and a
+            boolean mask marking the rows that hold an embedding (failed
+            rows are zero).
         """
+        matrix = np.zeros((len(texts), self.EMBEDDING_DIMENSIONS), dtype=np.float32)
+        mask = np.zeros(len(texts), dtype=bool)
+        
         if not texts:
-            return []
+            return matrix, mask
             
         if not self.client.model:
             logger.warning("Gemini client not initialized - returning None for embeddings")
-            return [None] * len(texts)
+            return matrix, mask
             
-        results: List[Optional[List[float]]] = [None] * len(texts)
+        # Snapshot the cache hits up front, so entries evicted by concurrent
+        # requests while this one is embedding are not lost
+        cached: Dict[str, np.ndarray] = {}
+        for text in texts:
+            if text not in cached:
+                vector = self._cache_get(self._cache_key(text))
+                if vector is not None:
+                    cached[text] = vector
         
-        # Process in batches
-        for i in range(0, len(texts), self.BATCH_SIZE):
-            batch_end = min(i + self.BATCH_SIZE, len(texts))
-            batch = texts[i:batch_end]
+        # Unique texts that are not cached yet
+        misses = list(dict.fromkeys(text for text in texts if text not in cached))
+        fresh: Dict[str, np.ndarray] = {}
+        
+        if misses:
+            # Smart batching: group texts of similar length
+            misses.sort(key=len)
+            batches = [misses[i:i + self.BATCH_SIZE] for i in range(0, len(misses), self.BATCH_SIZE)]
             
-            try:
-                # Call Gemini embedding API
-                # Note: embed_content is a module-level function in genai, not a model method
-                response = genai.embed_content(
-                    model=self.EMBEDDING_MODEL,
-                    content=batch,
-                    task_type="semantic_similarity"
-                )
+            max_workers = min(self.MAX_CONCURRENT_BATCHES, len(batches))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                batch_results = executor.map(self._embed_batch, batches)
                 
-                # Extract embeddings from response
-                if 'embedding' in response:
-                    # Single embedding or batch depending on input
-                    # For batch input, response['embedding'] is usually a list of embeddings
-                    embeddings = response['embedding']
-                    
-                    # Verify we got a list of lists (batch response)
-                    if isinstance(embeddings, list) and len(embeddings) > 0:
-                        # Check if it's a single vector (list of floats) or list of vectors
-                        if isinstance(embeddings[0], float):
-                            # Single vector - shouldn't happen for batch > 1 but possible for batch=1
-                            results[i] = embeddings
-                        else:
-                            # List of vectors
-                            for j, emb in enumerate(embeddings):
-                                if i + j < len(results):
-                                    results[i + j] = emb
-                    
-                else:
-                    logger.warning(f"Unexpected embedding response format: {response.keys()}")
-                    
-            except Exception as e:
-                logger.error(f"Embedding generation failed for batch {i}-{batch_end}: {str(e)}")
-                # Continue to next batch, leaving these as None
-                continue
+                for batch, embeddings in zip(batches, batch_results):
+                    for text, emb in zip(batch, embeddings):
+                        if emb is None:
+                            continue
+                        if len(emb) != self.EMBEDDING_DIMENSIONS:
+                            logger.warning(f"Invalid embedding dimensions: {len(emb)} (expected {self.EMBEDDING_DIMENSIONS})")
+                            continue
+                        # Stored unit-length, so cosine similarity is a plain dot product
+                        vector = np.asarray(emb, dtype=np.float32)
+                        norm = np.linalg.norm(vector)
+                        if norm > 0:
+                            vector /= norm
+                        fresh[text] = vector
+                        self._cache_put(self._cache_key(text), vector)
+        
+        # Failed texts were not stored, so their rows stay zero / masked out
+        for i, text in enumerate(texts):
+            vector = fresh[text] if text in fresh else cached.get(text)
+            if vector is not None:
+                matrix[i] = vector
+                mask[i] = True
         
         # Log summary
-        successful = sum(1 for r in results if r is not None)
-        logger.info(f"Generated embeddings: {successful}/{len(texts)} successful")
+        logger.info(
+            f"Generated embeddings: {int(mask.sum())}/{len(texts)} successful "
+            f"({len(cached)} unique cache hits, {len(misses)} unique texts requested from the API)"
+        )
         
-        return results
+        return matrix, mask
+    
+    def _cache_key(self, text: str) -> bytes:
+        """
+        Content address of a text's embedding: a 16-byte hash of model and text.
+        
+        Keeps long chunks out of the cache's keys, and a model change
+        never serves vectors from the old model.
+        """
+        return hashlib.blake2b(f"{self.EMBEDDING_MODEL}\0{text}".encode(), digest_size=16).digest()
+    
+    def _cache_get(self, key: bytes) -> Optional[np.ndarray]:
+        """Return the cached embedding for key (marking it recently used), or None."""
+        with self._cache_lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+            return embedding
+    
+    def _cache_put(self, key: bytes, embedding: np.ndarray) -> None:
+        """Store an embedding, evicting the least recently used entries when full."""
+        with self._cache_lock:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+    
+    def _embed_batch(self, batch: List[str]) -> List[Optional[List[float]]]:
+        """
+        Embed one batch of texts with a single API call.
+        
+        Args:
+            batch: Texts to embed (at most BATCH_SIZE).
+            
+        Returns:
+            Embeddings parallel to batch (all None if the call failed).
+        """
+        try:
+            # Note: embed_content is a module-level function in genai, not a model method
+            response = self.client._call_with_retry(
+                genai.embed_content,
+                model=self.EMBEDDING_MODEL,
+                content=batch,
+                task_type="semantic_similarity"
+            )
+        except Exception as e:
+            logger.error(f"Embedding generation failed for batch of {len(batch)}: {str(e)}")
+            return [None] * len(batch)
+        
+        # Response is {'embedding': [...]}; a single input may come back as one flat vector
+        embeddings = response.get('embedding') if isinstance(response, dict) else response
+        if not isinstance(embeddings, list) or len(embeddings) == 0:
+            logger.warning(f"Unexpected embedding response format: {type(response).__name__}")
+            return [None] * len(batch)
+        
+        if not isinstance(embeddings[0], list):
+            embeddings = [embeddings]
+        
+        if len(embeddings) != len(batch):
+            logger.warning(f"Embedding count mismatch: {len(embeddings)} for {len(batch)} texts")
+        
+        padded: List[Optional[List[float]]] = list(embeddings[:len(batch)])
+        return padded + [None] * (len(batch) - len(padded))
     
     def validate_embedding(self, embedding: Optional[List[float]]) -> bool:
         """
@@ -107,3 +214,13 @@ class EmbeddingService:
             return False
         
         return True
+
+@lru_cache(maxsize=1)
+def get_embedding_service() -> EmbeddingService:
+    """
+    Return the process-wide EmbeddingService, creating it on first use.
+    
+    Reusing one instance keeps its Gemini client and embedding cache
+    alive across requests.
+    """
+    return EmbeddingService()
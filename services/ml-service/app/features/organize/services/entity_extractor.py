@@ -1,7 +1,13 @@
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any
-from app.shared.utils.spacy_loader import get_nlp
-from app.features.organize.schemas.extract import ExtractedEntity, EntitySourceSnippet
+import sys
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, get_args
+import orjson
+from app.shared.utils.spacy_loader import run_ner_batch
+from app.features.organize.schemas.extract import ExtractedEntity, EntitySourceSnippet, EntityType
 
 logger = logging.getLogger(__name__)
 
@@ -19,8 +25,105 @@ LABEL_MAP = {
     "LANGUAGE": "CONCEPT",
 }
 
+# Valid values of ExtractedEntity.type
+ENTITY_TYPES = frozenset(get_args(EntityType))
+
 BASE_CONFIDENCE = 0.6
 
+# LRU cache of chunk hash -> spaCy entity spans (text, label, start_char, end_char),
+# so re-indexed chunks skip the pipeline
+SPACY_CACHE_SIZE = 4096
+_spacy_chunk_cache: "OrderedDict[str, Tuple[Tuple[str, str, int, int], ...]]" = OrderedDict()
+_spacy_cache_lock = threading.Lock()
+
+# Maximum number of in-flight Gemini requests per extraction call
+GEMINI_MAX_CONCURRENCY = 8
+
+# LRU cache of chunk hash -> parsed Gemini entities, so re-indexed chunks
+# do not hit the API again
+GEMINI_CACHE_SIZE = 1024
+_gemini_chunk_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+
+def _chunk_key(chunk: str) -> str:
+    """Hash a chunk for the spaCy and Gemini caches."""
+    return hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).hexdigest()
+
+def _spacy_entity_spans(text_chunks: List[str]) -> List[Tuple[Tuple[str, str, int, int], ...]]:
+    """
+    Get the spaCy entity spans of each chunk, running the pipeline only on uncached chunks.
+    
+    Args:
+        text_chunks: List of text strings to process.
+        
+    Returns:
+        (text, label, start_char, end_char) spans per chunk, in chunk order.
+    """
+    keys = [_chunk_key(chunk) for chunk in text_chunks]
+    
+    # Extraction runs in worker threads, so the shared cache is accessed under a lock
+    with _spacy_cache_lock:
+        spans_by_key = {key: _spacy_chunk_cache[key] for key in keys if key in _spacy_chunk_cache}
+        for key in spans_by_key:
+            _spacy_chunk_cache.move_to_end(key)
+    
+    # Unique chunks that are not cached yet go through the pipeline in one batch
+    misses = {key: chunk for key, chunk in zip(keys, text_chunks) if key not in spans_by_key}
+    found = {
+        key: tuple((ent.text, ent.label_, ent.start_char, ent.end_char) for ent in doc.ents)
+        for key, doc in zip(misses, run_ner_batch(list(misses.values())))
+    }
+    
+    with _spacy_cache_lock:
+        for key, spans in found.items():
+            _spacy_chunk_cache[key] = spans
+            if len(_spacy_chunk_cache) > SPACY_CACHE_SIZE:
+                _spacy_chunk_cache.popitem(last=False)
+    
+    spans_by_key.update(found)
+    return [spans_by_key[key] for key in keys]
+
+def _accumulate(
+    entities_map: Dict[str, ExtractedEntity],
+    name: str,
+    entity_type: str,
+    confidence: float,
+    source: EntitySourceSnippet,
+    repeat_boost: float,
+    max_confidence: float
+) -> None:
+    """
+    Record one entity mention in a map keyed by lowercased name.
+    
+    The first mention fixes the entity's cased name, type and confidence;
+    later mentions (in any casing) add their source and boost confidence.
+    Callers pass already valid fields (a type from ENTITY_TYPES, a confidence
+    in [0, 1]), so entities and sources are built without re-validation.
+    
+    Args:
+        entities_map: Map of lowercased name -> entity, updated in place.
+        name: Entity name as found in the text.
+        entity_type: Entity type for a new entity.
+        confidence: Confidence for a new entity.
+        source: Source snippet of this mention.
+        repeat_boost: Confidence added for each repeated mention.
+        max_confidence: Cap for the boosted confidence.
+    """
+    key = name.lower()
+    existing = entities_map.get(key)
+    if existing is not None:
+        existing.sources.append(source)
+        existing.confidence = min(max_confidence, existing.confidence + repeat_boost)
+    else:
+        # Interned, so recurring names share one string and the name comparisons
+        # downstream (dedup, co-occurrence, type lookups) hit the identity fast path
+        entities_map[key] = ExtractedEntity.model_construct(
+            name=sys.intern(name),
+            type=entity_type,
+            confidence=confidence,
+            sources=[source],
+            aliases=[]
+        )
+
 def extract_entities_spacy(text_chunks: List[str], doc_id: str) -> List[ExtractedEntity]:
     """
     Extracts entities from text chunks using spaCy.
@@ -32,18 +135,19 @@ def extract_entities_spacy(text_chunks: List[str], doc_id: str) -> List[Extracte
     Returns:
         List of ExtractedEntity objects.
     """
-    nlp = get_nlp()
     entities_map: Dict[str, ExtractedEntity] = {}
 
-    for chunk_index, chunk in enumerate(text_chunks):
-        doc = nlp(chunk)
+    # Uncached chunks go through the pipeline in batches; spans come back in order
+    chunk_spans = _spacy_entity_spans(text_chunks)
+    for chunk_index, (chunk, spans) in enumerate(zip(text_chunks, chunk_spans)):
         
-        for ent in doc.ents:
-            if ent.label_ not in LABEL_MAP:
+        for ent_text, ent_label, ent_start, ent_end in spans:
+            # One lookup maps the label and skips unmapped ones
+            mapped_type = LABEL_MAP.get(ent_label)
+            if mapped_type is None:
                 continue
-                
-            mapped_type = LABEL_MAP[ent.label_]
-            clean_name = ent.text.strip()
+            
+            clean_name = ent_text.strip()
             
             # Skip very short entities that are likely noise
             if len(clean_name) < 2:
@@ -56,35 +160,22 @@ def extract_entities_spacy(text_chunks: List[str], doc_id: str) -> List[Extracte
             
             # Create source snippet
             # Get a window of text around the entity
-            start = max(0, ent.start_char - 50)
-            end = min(len(chunk), ent.end_char + 50)
+            start = max(0, ent_start - 50)
+            end = min(len(chunk), ent_end + 50)
             snippet_text = chunk[start:end].replace("\n", " ").strip()
             
-            source = EntitySourceSnippet(
+            source = EntitySourceSnippet.model_construct(
                 docId=doc_id,
                 snippet=snippet_text,
                 chunkIndex=chunk_index
             )
 
-            if clean_name in entities_map:
-                # Merge with existing entity
-                existing = entities_map[clean_name]
-                existing.sources.append(source)
-                # Boost confidence slightly if found multiple times
-                existing.confidence = min(0.99, existing.confidence + 0.05)
-            else:
-                # Create new entity
-                entities_map[clean_name] = ExtractedEntity(
-                    name=clean_name,
-                    type=mapped_type,
-                    confidence=confidence,
-                    sources=[source],
-                    aliases=[]
-                )
+            # Boost confidence slightly if found multiple times
+            _accumulate(entities_map, clean_name, mapped_type, confidence, source, repeat_boost=0.05, max_confidence=0.99)
 
     return list(entities_map.values())
 
-def extract_entities_with_gemini(
+async def extract_entities_with_gemini(
     text_chunks: List[str], 
     doc_id: str, 
     use_gemini: bool = True
@@ -92,6 +183,11 @@ def extract_entities_with_gemini(
     """
     Hybrid entity extraction using spaCy baseline + Gemini enhancement.
     
+    Gemini calls are independent per chunk, so they are issued concurrently
+    (bounded by GEMINI_MAX_CONCURRENCY) and merged once all have completed.
+    Parsed responses are cached per chunk, so repeated chunks are free.
+    The spaCy pass runs in a worker thread at the same time.
+    
     Args:
         text_chunks: List of text strings to process.
         doc_id: Identifier for the source document.
@@ -100,103 +196,126 @@ def extract_entities_with_gemini(
     Returns:
         List of ExtractedEntity objects with merged results.
     """
-    import json
-    from app.shared.utils.gemini_client import GeminiClient
+    from app.shared.utils.gemini_client import GeminiClient, _JSON_FENCE_RE
     from app.features.organize.prompts import ENTITY_EXTRACTION_PROMPT
     
-    # Step 1: Get spaCy baseline
-    spacy_entities = extract_entities_spacy(text_chunks, doc_id)
+    # Step 1: Start the spaCy baseline off the event loop so it overlaps with Gemini
+    spacy_task = asyncio.create_task(asyncio.to_thread(extract_entities_spacy, text_chunks, doc_id))
     
     # If Gemini disabled or unavailable, return spaCy-only
     if not use_gemini:
         logger.info("Gemini disabled, using spaCy-only extraction")
-        return spacy_entities
+        return await spacy_task
     
     try:
         client = GeminiClient()
         if not client.model:
             logger.warning("Gemini model not available, falling back to spaCy-only")
-            return spacy_entities
+            return await spacy_task
         
-        # Step 2: Send to Gemini for enhancement
-        gemini_entities_map: Dict[str, ExtractedEntity] = {}
+        # Step 2: Send chunks to Gemini concurrently
+        semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
         
-        for chunk_index, chunk in enumerate(text_chunks):
-            full_prompt = f"{ENTITY_EXTRACTION_PROMPT}\n{chunk}"
+        async def process_chunk(chunk: str) -> List[Dict[str, Any]]:
+            key = _chunk_key(chunk)
+            if key in _gemini_chunk_cache:
+                _gemini_chunk_cache.move_to_end(key)
+                return _gemini_chunk_cache[key]
             
-            try:
-                response = client._call_with_retry(
+            full_prompt = f"{ENTITY_EXTRACTION_PROMPT}\n{chunk}"
+            async with semaphore:
+                # The SDK call is blocking, so run it off the event loop
+                response = await asyncio.to_thread(
+                    client._call_with_retry,
                     client.model.generate_content,
                     full_prompt
                 )
-                
-                # Parse JSON response
-                clean_text = response.text.replace("```json", "").replace("```", "").strip()
-                data = json.loads(clean_text)
-                
+            
+            # Parse JSON response (failures are reported by the merge loop)
+            data = orjson.loads(_JSON_FENCE_RE.sub("", response.text))
+            entities_data = data.get("entities", [])
+            
+            _gemini_chunk_cache[key] = entities_data
+            if len(_gemini_chunk_cache) > GEMINI_CACHE_SIZE:
+                _gemini_chunk_cache.popitem(last=False)
+            return entities_data
+        
+        # Identical chunks are sent once
+        unique_chunks = list(dict.fromkeys(text_chunks))
+        gemini_results = asyncio.gather(
+            *[process_chunk(chunk) for chunk in unique_chunks],
+            return_exceptions=True
+        )
+        spacy_entities, unique_results = await asyncio.gather(spacy_task, gemini_results)
+        results_by_chunk = dict(zip(unique_chunks, unique_results))
+        results = [results_by_chunk[chunk] for chunk in text_chunks]
+        
+        # Merge Gemini results single-threadedly, in chunk order
+        gemini_entities_map: Dict[str, ExtractedEntity] = {}
+        
+        for chunk_index, (chunk, result) in enumerate(zip(text_chunks, results)):
+            if isinstance(result, orjson.JSONDecodeError):
+                logger.warning(f"Failed to parse Gemini JSON for chunk {chunk_index}: {result}")
+                continue
+            if isinstance(result, BaseException):
+                logger.warning(f"Gemini extraction failed for chunk {chunk_index}: {result}")
+                continue
+            
+            try:
                 # Process Gemini entities
-                for ent_data in data.get("entities", []):
+                for ent_data in result:
                     name = ent_data.get("name", "").strip()
                     entity_type = ent_data.get("type", "CONCEPT")
-                    confidence = min(0.92, float(ent_data.get("confidence", 0.7)))  # Cap at 0.92
+                    confidence = min(0.92, max(0.0, float(ent_data.get("confidence", 0.7))))  # Cap at 0.92
                     
                     if not name or len(name) < 2:
                         continue
                     
+                    # Gemini can return any type string and entities are built with
+                    # model_construct, so this check is the only type validation
+                    if entity_type not in ENTITY_TYPES:
+                        logger.debug(f"Skipping Gemini entity '{name}' with unknown type {entity_type!r}")
+                        continue
+                    
                     # Create source snippet
-                    source = EntitySourceSnippet(
+                    source = EntitySourceSnippet.model_construct(
                         docId=doc_id,
                         snippet=chunk[:200],  # First 200 chars as snippet
                         chunkIndex=chunk_index
                     )
                     
-                    if name in gemini_entities_map:
-                        gemini_entities_map[name].sources.append(source)
-                        gemini_entities_map[name].confidence = min(0.92, gemini_entities_map[name].confidence + 0.02)
-                    else:
-                        gemini_entities_map[name] = ExtractedEntity(
-                            name=name,
-                            type=entity_type,
-                            confidence=confidence,
-                            sources=[source],
-                            aliases=[]
-                        )
+                    _accumulate(gemini_entities_map, name, entity_type, confidence, source, repeat_boost=0.02, max_confidence=0.92)
                         
-            except json.JSONDecodeError as e:
-                logger.warning(f"Failed to parse Gemini JSON for chunk {chunk_index}: {e}")
-                continue
             except Exception as e:
                 logger.warning(f"Gemini extraction failed for chunk {chunk_index}: {e}")
                 continue
         
-        # Step 3: Merge spaCy and Gemini results
-        merged_entities: Dict[str, ExtractedEntity] = {}
-        
-        # Add all spaCy entities
-        for entity in spacy_entities:
-            merged_entities[entity.name] = entity
+        # Step 3: Merge spaCy and Gemini results (keyed by lowercased name)
+        merged_entities: Dict[str, ExtractedEntity] = {
+            entity.name.lower(): entity for entity in spacy_entities
+        }
         
         # Merge Gemini entities
-        for name, gemini_entity in gemini_entities_map.items():
-            if name in merged_entities:
+        for key, gemini_entity in gemini_entities_map.items():
+            if key in merged_entities:
                 # Found by both - boost confidence
-                merged_entities[name].confidence = min(0.98, merged_entities[name].confidence + 0.05)
+                merged_entities[key].confidence = min(0.98, merged_entities[key].confidence + 0.05)
                 # Merge sources (avoid duplicates)
-                existing_snippets = {s.snippet for s in merged_entities[name].sources}
+                existing_snippets = {s.snippet for s in merged_entities[key].sources}
                 for source in gemini_entity.sources:
                     if source.snippet not in existing_snippets:
-                        merged_entities[name].sources.append(source)
-                logger.debug(f"Entity '{name}' found by both spaCy and Gemini, boosted confidence")
+                        merged_entities[key].sources.append(source)
+                logger.debug(f"Entity '{gemini_entity.name}' found by both spaCy and Gemini, boosted confidence")
             else:
                 # Gemini-only entity - add if confidence sufficient
                 if gemini_entity.confidence >= 0.55:
-                    merged_entities[name] = gemini_entity
-                    logger.debug(f"Entity '{name}' added from Gemini (confidence: {gemini_entity.confidence})")
+                    merged_entities[key] = gemini_entity
+                    logger.debug(f"Entity '{gemini_entity.name}' added from Gemini (confidence: {gemini_entity.confidence})")
         
         logger.info(f"Hybrid extraction: {len(spacy_entities)} from spaCy, {len(gemini_entities_map)} from Gemini, {len(merged_entities)} merged")
         return list(merged_entities.values())
         
     except Exception as e:
         logger.error(f"Gemini enhancement failed, falling back to spaCy-only: {e}")
-        return spacy_entities
+        return await spacy_task
 
@@ -1,70 +1,299 @@
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Set, Optional, Tuple
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+import numpy as np
 from app.features.organize.schemas.extract import ExtractedEntity, ExtractedRelationship
+from app.shared.utils.gemini_client import RELATIONSHIP_BATCH_SIZE, RelationshipPair, max_concurrent_calls
 
 logger = logging.getLogger(__name__)
 
+# Below this size a pure-Python merge beats the overhead of np.intersect1d
+SMALL_INTERSECTION_SIZE = 16
+
+def _count_shared(chunks1: np.ndarray, chunks2: np.ndarray) -> int:
+    """
+    Count the values two sorted, unique arrays have in common.
+    
+    Args:
+        chunks1: Sorted, unique chunk indices.
+        chunks2: Sorted, unique chunk indices.
+        
+    Returns:
+        Size of the intersection.
+    """
+    if len(chunks1) >= SMALL_INTERSECTION_SIZE or len(chunks2) >= SMALL_INTERSECTION_SIZE:
+        return int(np.intersect1d(chunks1, chunks2, assume_unique=True).size)
+    
+    # Two-pointer merge
+    a, b = np.asarray(chunks1).tolist(), np.asarray(chunks2).tolist()
+    i = j = shared = 0
+    while i < len(a) and j < len(b):
+        if a[i] == b[j]:
+            shared += 1
+            i += 1
+            j += 1
+        elif a[i] < b[j]:
+            i += 1
+        else:
+            j += 1
+    return shared
+
+def _cooccurrence_pairs(
+    matrix: np.ndarray,
+    counts: np.ndarray,
+    min_weight: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find the entity pairs whose co-occurrence weight passes the threshold.
+    
+    Shared-chunk counts come from one matmul (M @ M.T, exact in float32);
+    weights are only computed for the pairs that share a chunk.
+    
+    Args:
+        matrix: Boolean entity x chunk occurrence matrix.
+        counts: Number of chunks each entity appears in.
+        min_weight: Minimum weight threshold (0.0-1.0).
+        
+    Returns:
+        Tuple of (sources, targets, weights) arrays for the pairs with
+        sources < targets, sorted by (source, target).
+    """
+    as_float = matrix.astype(np.float32)
+    shared = as_float @ as_float.T
+    
+    # Same formula as calculate_cooccurrence_weight (already <= 1.0)
+    sources, targets = np.nonzero(np.triu(shared, k=1))
+    weights = shared[sources, targets].astype(np.float64) / np.minimum(counts[sources], counts[targets])
+    
+    keep = weights >= min_weight
+    return sources[keep], targets[keep], weights[keep]
+
+# Pattern definitions: (keywords, entity_type_requirements, relationship_type)
+# Earlier patterns take priority
+_PATTERNS: Tuple[Tuple[Tuple[str, ...], Optional[Tuple[Optional[str], Optional[str]]], str], ...] = (
+    # Founding relationships
+    (("founded", "co-founded", "started", "established", "launched"), None, "founded"),
+    
+    # Leadership relationships  
+    (("ceo", "chief executive", "president of", "head of", "director of"), ("PERSON", "ORGANIZATION"), "ceo_of"),
+    (("leads", "leading", "runs", "manages"), ("PERSON", "ORGANIZATION"), "leads"),
+    
+    # Employment relationships
+    (("works at", "employed by", "employee of", "working at"), ("PERSON", "ORGANIZATION"), "works_at"),
+    (("joined", "hired by"), ("PERSON", "ORGANIZATION"), "works_at"),
+    
+    # Creation/authorship
+    (("authored", "wrote", "published"), ("PERSON", "PAPER"), "authored"),
+    (("created", "developed", "invented", "designed"), None, "created"),
+    
+    # Location relationships
+    (("headquartered in", "based in", "headquarters in"), ("ORGANIZATION", "LOCATION"), "headquartered_in"),
+    (("located in", "situated in", "in"), (None, "LOCATION"), "located_in"),
+    (("born in",), ("PERSON", "LOCATION"), "born_in"),
+    (("lives in", "resides in"), ("PERSON", "LOCATION"), "lives_in"),
+    
+    # Collaboration
+    (("collaborated with", "worked with", "partnered with"), ("PERSON", "PERSON"), "collaborated_with"),
+    (("colleague",), ("PERSON", "PERSON"), "colleague_of"),
+    
+    # Organizational
+    (("acquired", "bought", "purchased"), ("ORGANIZATION", "ORGANIZATION"), "acquired_by"),
+    (("part of", "subsidiary of", "division of"), ("ORGANIZATION", "ORGANIZATION"), "part_of"),
+)
+
+# One compiled regex per pattern, matching any of its keywords as whole words
+# (so "in" does not match "intent" and "designed" does not match "redesigned").
+# An optional inflection suffix keeps plural and verb forms ("colleagues", "partnered").
+_COMPILED_PATTERNS: Tuple[Tuple["re.Pattern[str]", Optional[Tuple[Optional[str], Optional[str]]], str], ...] = tuple(
+    (re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")(?:s|es|ed)?\b"), type_requirements, rel_type)
+    for keywords, type_requirements, rel_type in _PATTERNS
+)
+
+@lru_cache(maxsize=4096)
+def _lowered(snippet: str) -> str:
+    """
+    Lowercase an example snippet.
+    
+    Examples are drawn from a few shared chunks, so the same snippet recurs
+    across many relationships and is only lowercased once.
+    """
+    return snippet.lower()
+
+def _types_match(
+    source_type: Optional[str],
+    target_type: Optional[str],
+    requirements: Optional[Tuple[Optional[str], Optional[str]]]
+) -> bool:
+    """
+    Check whether an entity type pair satisfies a pattern's type requirements.
+    
+    Each required type must be one of the two entity types (in either
+    order); None in the requirements matches any type. Patterns with type
+    requirements never match when an entity type is unknown.
+    """
+    if requirements is None:
+        return True
+    if source_type is None or target_type is None:
+        return False
+    types = (source_type, target_type)
+    return all(required is None or required in types for required in requirements)
+
+@lru_cache(maxsize=None)
+def _keyword_table(
+    source_type: Optional[str],
+    target_type: Optional[str]
+) -> Tuple[Tuple["re.Pattern[str]", str], ...]:
+    """
+    Get the (keyword regex, rel_type) pairs of the patterns that apply to a type pair.
+    
+    Type requirements only depend on the types, so they are checked once
+    per type pair (a small, fixed set) and the result is reused for every
+    relationship.
+    """
+    return tuple(
+        (regex, rel_type)
+        for regex, type_requirements, rel_type in _COMPILED_PATTERNS
+        if _types_match(source_type, target_type, type_requirements)
+    )
+
+@lru_cache(maxsize=4096)
+def _match_patterns(
+    examples: Tuple[str, ...],
+    source_type: Optional[str],
+    target_type: Optional[str]
+) -> Optional[str]:
+    """
+    Memoized body of RelationshipClassifier._classify_with_patterns.
+    
+    Co-occurrence examples are drawn from a few shared chunks, so the
+    same examples and type pair recur across many entity pairs.
+    """
+    # Combine all examples into one text for pattern matching
+    text = " ".join(map(_lowered, examples))
+    
+    for regex, rel_type in _keyword_table(source_type, target_type):
+        match = regex.search(text)
+        if match:
+            logger.info("Pattern matched: '%s' -> %s", match.group(0), rel_type)
+            return rel_type
+    
+    return None  # No pattern matched
+
 class RelationshipClassifier:
     """
     Classifies relationships between entities based on co-occurrence in text chunks.
     """
     
+    # Maximum number of cached Gemini classifications
+    LLM_CACHE_SIZE = 4096
+    
+    # Maximum number of in-flight Gemini classification calls (async path),
+    # enough to use the configured request quota
+    LLM_MAX_CONCURRENCY = max_concurrent_calls()
+    
+    def __init__(self):
+        # LRU cache of classification key -> Gemini classification
+        self._llm_cache: "OrderedDict[bytes, Dict]" = OrderedDict()
+        self._llm_cache_hits = 0
+        self._llm_cache_misses = 0
+    
     def find_entity_occurrences(
         self, 
         text_chunks: List[str], 
         entities: List[ExtractedEntity]
-    ) -> Dict[str, Set[int]]:
+    ) -> Dict[str, np.ndarray]:
         """
-        Map each entity name to the set of chunk indices where it appears.
+        Map each entity name to the chunk indices where it appears.
         
         Args:
             text_chunks: List of text chunks.
             entities: List of extracted entities.
             
         Returns:
-            Dictionary mapping entity name to set of chunk indices.
+            Dictionary mapping entity name to a sorted, unique int32 array of chunk indices.
         """
-        occurrences: Dict[str, Set[int]] = {}
+        chunk_lists: Dict[str, List[int]] = {}
         
         for entity in entities:
-            if entity.name not in occurrences:
-                occurrences[entity.name] = set()
-            
             # Add chunk indices from entity sources
-            for source in entity.sources:
-                occurrences[entity.name].add(source.chunkIndex)
-                
-        return occurrences
+            chunk_lists.setdefault(entity.name, []).extend(
+                source.chunkIndex for source in entity.sources
+            )
+        
+        return {
+            name: np.unique(np.asarray(chunks, dtype=np.int32))
+            for name, chunks in chunk_lists.items()
+        }
 
     def calculate_cooccurrence_weight(
         self, 
-        chunks1: Set[int], 
-        chunks2: Set[int]
+        chunks1: np.ndarray, 
+        chunks2: np.ndarray
     ) -> float:
         """
         Calculate relationship weight based on co-occurrence.
         Formula: shared_chunks / min(count1, count2)
         
         Args:
-            chunks1: Set of chunk indices for first entity.
-            chunks2: Set of chunk indices for second entity.
+            chunks1: Sorted, unique chunk indices for first entity.
+            chunks2: Sorted, unique chunk indices for second entity.
             
         Returns:
             Weight between 0.0 and 1.0.
         """
-        if not chunks1 or not chunks2:
+        if len(chunks1) == 0 or len(chunks2) == 0:
             return 0.0
             
-        shared = chunks1.intersection(chunks2)
-        if not shared:
+        shared = _count_shared(chunks1, chunks2)
+        if shared == 0:
             return 0.0
             
         # Weight is percentage of overlap relative to the smaller entity's footprint
         # This allows a small entity (appearing once) to be strongly related to a large entity
-        # if it appears in that same chunk.
-        weight = len(shared) / min(len(chunks1), len(chunks2))
+        # if it appears in that same chunk. Shared chunks are a subset of both, so it
+        # never exceeds 1.0.
+        return shared / min(len(chunks1), len(chunks2))
+
+    def _build_occurrence_matrix(
+        self,
+        entities: List[ExtractedEntity]
+    ) -> Tuple[np.ndarray, List[str], np.ndarray, np.ndarray]:
+        """
+        Encode entity occurrences as a boolean entity x chunk matrix.
+        
+        Same occurrences as find_entity_occurrences, gathered in a single
+        pass over the entity sources without per-entity arrays.
         
-        return min(1.0, weight)
+        Args:
+            entities: List of extracted entities.
+            
+        Returns:
+            Tuple of (matrix, entity_names, counts, chunk_ids): matrix[i, c] is
+            True if entity_names[i] appears in chunk chunk_ids[c], and counts[i]
+            is the number of chunks entity i appears in.
+        """
+        rows_by_name: Dict[str, int] = {}
+        rows: List[int] = []
+        chunks: List[int] = []
+        
+        for entity in entities:
+            row = rows_by_name.setdefault(entity.name, len(rows_by_name))
+            for source in entity.sources:
+                rows.append(row)
+                chunks.append(source.chunkIndex)
+        
+        chunk_ids, columns = np.unique(np.asarray(chunks, dtype=np.int32), return_inverse=True)
+        
+        matrix = np.zeros((len(rows_by_name), len(chunk_ids)), dtype=bool)
+        matrix[np.asarray(rows, dtype=np.intp), columns] = True
+        
+        counts = matrix.sum(axis=1)
+        return matrix, list(rows_by_name), counts, chunk_ids
 
     def build_cooccurrence_relationships(
         self, 
@@ -88,52 +317,49 @@ class RelationshipClassifier:
             
         relationships: List[ExtractedRelationship] = []
         
-        # Step 1: Track occurrences
-        occurrences = self.find_entity_occurrences(text_chunks, entities)
-        entity_names = list(occurrences.keys())
+        # Step 1: Track occurrences as an entity x chunk matrix
+        matrix, entity_names, counts, chunk_ids = self._build_occurrence_matrix(entities)
         
-        # Step 2: Compare all pairs
-        for i in range(len(entity_names)):
-            name1 = entity_names[i]
-            chunks1 = occurrences[name1]
+        # Step 2: Weighted co-occurring pairs above the threshold
+        sources, targets, weights = _cooccurrence_pairs(matrix, counts, min_weight)
+        
+        # Example snippet per matrix column, truncated once rather than per pair
+        # (None for chunk indices outside text_chunks)
+        snippets: List[Optional[str]] = []
+        for idx in chunk_ids.tolist():
+            if not 0 <= idx < len(text_chunks):
+                snippets.append(None)
+                continue
+            # Truncate if too long (keep first 200 chars)
+            snippet = text_chunks[idx]
+            if len(snippet) > 200:
+                snippet = snippet[:197] + "..."
+            snippets.append(snippet)
+        
+        # Step 3: Build relationships
+        for i, j, weight in zip(sources.tolist(), targets.tolist(), weights.tolist()):
+            name1, name2 = entity_names[i], entity_names[j]
             
-            for j in range(i + 1, len(entity_names)):
-                name2 = entity_names[j]
-                chunks2 = occurrences[name2]
-                
-                # Calculate weight
-                weight = self.calculate_cooccurrence_weight(chunks1, chunks2)
-                
-                # Filter by threshold
-                if weight >= min_weight:
-                    # Find shared chunks for examples
-                    shared_indices = chunks1.intersection(chunks2)
-                    examples = []
-                    
-                    # Add up to 3 examples
-                    for idx in list(shared_indices)[:3]:
-                        if 0 <= idx < len(text_chunks):
-                            # Truncate if too long (keep first 200 chars)
-                            snippet = text_chunks[idx]
-                            if len(snippet) > 200:
-                                snippet = snippet[:197] + "..."
-                            examples.append(snippet)
-                    
-                    # Create relationship
-                    rel = ExtractedRelationship(
-                        sourceEntity=name1,
-                        targetEntity=name2,
-                        type="cooccurrence",
-                        relationType="related_to", # Generic default for co-occurrence
-                        weight=weight,
-                        confidence=0.7, # Base confidence for co-occurrence
-                        examples=examples
-                    )
-                    
-                    relationships.append(rel)
-                    logger.debug(f"Found relationship: {name1} <-> {name2} (weight: {weight:.2f})")
+            # First 3 shared chunks as examples
+            shared_columns = np.flatnonzero(matrix[i] & matrix[j])[:3].tolist()
+            examples = [snippets[c] for c in shared_columns if snippets[c] is not None]
+            
+            # Create relationship (every field is built here and already valid,
+            # so skip per-field validation)
+            rel = ExtractedRelationship.model_construct(
+                sourceEntity=name1,
+                targetEntity=name2,
+                type="cooccurrence",
+                relationType="related_to", # Generic default for co-occurrence
+                weight=weight,
+                confidence=0.7, # Base confidence for co-occurrence
+                examples=examples
+            )
+            
+            relationships.append(rel)
+            logger.debug("Found relationship: %s <-> %s (weight: %.2f)", name1, name2, weight)
                     
-        logger.info(f"Built {len(relationships)} co-occurrence relationships from {len(entities)} entities")
+        logger.info("Built %d co-occurrence relationships from %d entities", len(relationships), len(entities))
         return relationships
 
     def _classify_with_patterns(
@@ -148,64 +374,54 @@ class RelationshipClassifier:
         Classify relationship using pattern matching on example text.
         Returns relationship type if pattern found, None otherwise.
         """
-        # Combine all examples into one text for pattern matching
-        text = " ".join(examples).lower()
+        return _match_patterns(tuple(examples), source_type, target_type)
+
+    @staticmethod
+    def _llm_cache_key(
+        source_entity: str,
+        target_entity: str,
+        examples: List[str],
+        source_type: Optional[str],
+        target_type: Optional[str]
+    ) -> bytes:
+        """Hash everything the Gemini classification prompt is built from."""
+        joined = "\x1f".join([source_entity, target_entity, source_type or "", target_type or "", *examples])
+        return hashlib.blake2b(joined.encode("utf-8"), digest_size=16).digest()
+
+    def _llm_cache_get(self, key: bytes) -> Optional[Dict]:
+        """Return a copy of a cached classification (marking it recently used), or None."""
+        cached = self._llm_cache.get(key)
+        if cached is None:
+            self._llm_cache_misses += 1
+            return None
+        self._llm_cache_hits += 1
+        self._llm_cache.move_to_end(key)
+        logger.debug("Cached Gemini classification: %s", cached["type"])
+        return dict(cached)
+
+    def llm_cache_stats(self) -> Dict[str, float]:
+        """
+        Return size and hit statistics of the Gemini classification cache.
         
-        # Pattern definitions: (keywords, entity_type_requirements, relationship_type)
-        patterns = [
-            # Founding relationships
-            (["founded", "co-founded", "started", "established", "launched"], None, "founded"),
-            
-            # Leadership relationships  
-            (["ceo", "chief executive", "president of", "head of", "director of"], ["PERSON", "ORGANIZATION"], "ceo_of"),
-            (["leads", "leading", "runs", "manages"], ["PERSON", "ORGANIZATION"], "leads"),
-            
-            # Employment relationships
-            (["works at", "employed by", "employee of", "working at"], ["PERSON", "ORGANIZATION"], "works_at"),
-            (["joined", "hired by"], ["PERSON", "ORGANIZATION"], "works_at"),
-            
-            # Creation/authorship
-            (["authored", "wrote", "published"], ["PERSON", "PAPER"], "authored"),
-            (["created", "developed", "invented", "designed"], None, "created"),
-            
-            # Location relationships
-            (["headquartered in", "based in", "headquarters in"], ["ORGANIZATION", "LOCATION"], "headquartered_in"),
-            (["located in", "situated in", "in"], [None, "LOCATION"], "located_in"),
-            (["born in"], ["PERSON", "LOCATION"], "born_in"),
-            (["lives in", "resides in"], ["PERSON", "LOCATION"], "lives_in"),
-            
-            # Collaboration
-            (["collaborated with", "worked with", "partnered with"], ["PERSON", "PERSON"], "collaborated_with"),
-            (["colleague"], ["PERSON", "PERSON"], "colleague_of"),
-            
-            # Organizational
-            (["acquired", "bought", "purchased"], ["ORGANIZATION", "ORGANIZATION"], "acquired_by"),
-            (["part of", "subsidiary of", "division of"], ["ORGANIZATION", "ORGANIZATION"], "part_of"),
-        ]
-        
-        # Check each pattern
-        for keywords, type_requirements, rel_type in patterns:
-            # Check if any keyword appears in text
-            for keyword in keywords:
-                if keyword in text:
-                    # Validate entity types if requirements specified
-                    if type_requirements:
-                        # Check if entity types match (either order)
-                        types = [source_type, target_type]
-                        if all(t is not None for t in types):
-                            # Must match in either direction
-                            if (types == type_requirements or 
-                                types == list(reversed(type_requirements)) or
-                                (type_requirements[0] is None or types[0] == type_requirements[0] or types[1] == type_requirements[0]) and
-                                (type_requirements[1] is None or types[1] == type_requirements[1] or types[0] == type_requirements[1])):
-                                logger.info(f"Pattern matched: '{keyword}' -> {rel_type}")
-                                return rel_type
-                    else:
-                        # No type requirements, pattern matches
-                        logger.info(f"Pattern matched: '{keyword}' -> {rel_type}")
-                        return rel_type
-        
-        return None  # No pattern matched
+        Returns:
+            Dict with 'size', 'hits', 'misses' and 'hit_rate' (0.0 before any lookup).
+        """
+        lookups = self._llm_cache_hits + self._llm_cache_misses
+        return {
+            "size": len(self._llm_cache),
+            "hits": self._llm_cache_hits,
+            "misses": self._llm_cache_misses,
+            "hit_rate": self._llm_cache_hits / lookups if lookups else 0.0
+        }
+
+    def _llm_cache_put(self, key: bytes, classification: Dict) -> None:
+        """Store a classification, evicting the least recently used entries when full."""
+        # GeminiClient reports failures as the default related_to/0.5, don't pin those
+        if classification == {"type": "related_to", "confidence": 0.5}:
+            return
+        self._llm_cache[key] = dict(classification)
+        if len(self._llm_cache) > self.LLM_CACHE_SIZE:
+            self._llm_cache.popitem(last=False)
 
     def classify_relationships_with_llm(
         self,
@@ -221,72 +437,222 @@ class RelationshipClassifier:
             relationships: List of relationships to classify.
             gemini_client: Instance of GeminiClient.
             entities: Optional list of entities for type lookup.
-            delay_ms: Delay in milliseconds between API calls to avoid rate limiting.
+            delay_ms: Minimum delay in milliseconds between the end of one API call
+                and the start of the next, to avoid rate limiting (pattern matches
+                and cached classifications are not delayed).
             
         Returns:
             List of relationships with updated types.
         """
-        import time
+        # Create entity type lookup
+        entity_types = {}
+        if entities:
+            entity_types = {entity.name: entity.type for entity in entities}
+            logger.info("Entity type lookup created: %d entities", len(entity_types))
+        
+        total = len(relationships)
+        classified_count = 0
+        
+        # Only classify strong relationships to save costs/time
+        strong = [(idx, rel) for idx, rel in enumerate(relationships) if rel.weight >= 0.5]
+        
+        # Earliest time the next API call may start
+        next_allowed = 0.0
+        
+        for idx, rel in strong:
+            try:
+                # Get entity types for context
+                source_type = entity_types.get(rel.sourceEntity)
+                target_type = entity_types.get(rel.targetEntity)
+                
+                logger.info(
+                    "Classifying relationship %d/%d: %s (%s) <-> %s (%s)",
+                    idx + 1, total, rel.sourceEntity, source_type or "?", rel.targetEntity, target_type or "?"
+                )
+                
+                # First try pattern-based classification
+                pattern_type = self._classify_with_patterns(
+                    rel.sourceEntity,
+                    rel.targetEntity,
+                    rel.examples,
+                    source_type,
+                    target_type
+                )
+                
+                if pattern_type:
+                    # Pattern matched! Use it directly
+                    classification = {"type": pattern_type, "confidence": 0.85}
+                    logger.info("✓ Pattern-based classification: %s", pattern_type)
+                else:
+                    # No pattern match, try Gemini
+                    logger.debug("No pattern match, trying Gemini...")
+                    key = self._llm_cache_key(rel.sourceEntity, rel.targetEntity, rel.examples, source_type, target_type)
+                    classification = self._llm_cache_get(key)
+                    if classification is None:
+                        # Wait out whatever is left of the delay since the previous API call
+                        wait = next_allowed - time.monotonic()
+                        if wait > 0:
+                            time.sleep(wait)
+                        try:
+                            classification = gemini_client.classify_relationship(
+                                rel.sourceEntity,
+                                rel.targetEntity,
+                                rel.examples,
+                                source_type=source_type,
+                                target_type=target_type
+                            )
+                        finally:
+                            next_allowed = time.monotonic() + delay_ms / 1000.0
+                        self._llm_cache_put(key, classification)
+                
+                # Update relationship
+                rel.relationType = classification["type"]
+                rel.confidence = max(rel.confidence, classification["confidence"])
+                classified_count += 1
+                logger.info("✓ Classified as '%s' (confidence: %.2f)", rel.relationType, rel.confidence)
+                
+            except Exception as e:
+                logger.warning("Failed to classify relationship %s-%s: %s", rel.sourceEntity, rel.targetEntity, e)
+        
+        logger.info(
+            "Classification complete: %d/%d relationships classified (LLM cache hit rate: %.0f%%)",
+            classified_count, total, self.llm_cache_stats()["hit_rate"] * 100
+        )
+        return list(relationships)
+
+    async def classify_relationships_with_llm_async(
+        self,
+        relationships: List[ExtractedRelationship],
+        gemini_client,
+        entities: List[ExtractedEntity] = None,
+        delay_ms: int = 0,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        batch_size: int = RELATIONSHIP_BATCH_SIZE
+    ) -> List[ExtractedRelationship]:
+        """
+        Concurrent, batched version of classify_relationships_with_llm.
         
+        Relationships that no pattern or cached classification covers are
+        sent to Gemini batch_size pairs per call. Calls use the SDK's async
+        API with at most max_concurrency in flight, instead of one after
+        another. Pattern matches and cached classifications never
+        wait for a slot.
+        
+        Args:
+            relationships: List of relationships to classify.
+            gemini_client: Instance of GeminiClient.
+            entities: Optional list of entities for type lookup.
+            delay_ms: Minimum delay in milliseconds between the starts of
+                consecutive API calls, to stay under the rate limit.
+            max_concurrency: Maximum number of concurrent API calls.
+            batch_size: Maximum number of relationships per API call.
+            
+        Returns:
+            List of relationships with updated types, in input order.
+        """
         # Create entity type lookup
         entity_types = {}
         if entities:
             entity_types = {entity.name: entity.type for entity in entities}
-            logger.info(f"Entity type lookup created: {len(entity_types)} entities")
+            logger.info("Entity type lookup created: %d entities", len(entity_types))
         
-        enhanced_relationships = []
         total = len(relationships)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        loop = asyncio.get_running_loop()
+        throttle_lock = asyncio.Lock()
+        next_call_at = loop.time()
+        
+        async def throttle() -> None:
+            # Space out call starts by delay_ms
+            nonlocal next_call_at
+            async with throttle_lock:
+                wait = next_call_at - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                next_call_at = loop.time() + delay_ms / 1000.0
+        
+        def apply(rel: ExtractedRelationship, classification: Dict) -> None:
+            rel.relationType = classification["type"]
+            rel.confidence = max(rel.confidence, classification["confidence"])
+            logger.info("✓ Classified as '%s' (confidence: %.2f)", rel.relationType, rel.confidence)
+        
+        # Only classify strong relationships to save costs/time
+        strong = [(idx, rel) for idx, rel in enumerate(relationships) if rel.weight >= 0.5]
+        
+        # Pattern and cache pass; only the misses go to Gemini
         classified_count = 0
+        pending: Dict[bytes, Tuple[RelationshipPair, List[ExtractedRelationship]]] = {}
+        for idx, rel in strong:
+            # Get entity types for context
+            source_type = entity_types.get(rel.sourceEntity)
+            target_type = entity_types.get(rel.targetEntity)
+            
+            logger.info(
+                "Classifying relationship %d/%d: %s (%s) <-> %s (%s)",
+                idx + 1, total, rel.sourceEntity, source_type or "?", rel.targetEntity, target_type or "?"
+            )
+            
+            pattern_type = self._classify_with_patterns(
+                rel.sourceEntity,
+                rel.targetEntity,
+                rel.examples,
+                source_type,
+                target_type
+            )
+            if pattern_type:
+                logger.info("✓ Pattern-based classification: %s", pattern_type)
+                apply(rel, {"type": pattern_type, "confidence": 0.85})
+                classified_count += 1
+                continue
+            
+            key = self._llm_cache_key(rel.sourceEntity, rel.targetEntity, rel.examples, source_type, target_type)
+            cached = self._llm_cache_get(key)
+            if cached is not None:
+                apply(rel, cached)
+                classified_count += 1
+                continue
+            
+            # Relationships with the same key share one classification
+            if key in pending:
+                pending[key][1].append(rel)
+            else:
+                pending[key] = ((rel.sourceEntity, rel.targetEntity, rel.examples, source_type, target_type), [rel])
         
-        for idx, rel in enumerate(relationships):
-            # Only classify strong relationships to save costs/time
-            if rel.weight >= 0.5:
-                try:
-                    # Get entity types for context
-                    source_type = entity_types.get(rel.sourceEntity)
-                    target_type = entity_types.get(rel.targetEntity)
-                    
-                    logger.info(f"Classifying relationship {idx + 1}/{total}: {rel.sourceEntity} ({source_type or '?'}) <-> {rel.targetEntity} ({target_type or '?'})")
-                    
-                    # First try pattern-based classification
-                    pattern_type = self._classify_with_patterns(
-                        rel.sourceEntity,
-                        rel.targetEntity,
-                        rel.examples,
-                        source_type,
-                        target_type
+        async def classify_batch(batch: List[Tuple[bytes, RelationshipPair, List[ExtractedRelationship]]]) -> int:
+            try:
+                async with semaphore:
+                    if delay_ms > 0:
+                        await throttle()
+                    classifications = await gemini_client.classify_relationships_batch_async(
+                        [pair for _, pair, _ in batch]
                     )
-                    
-                    if pattern_type:
-                        # Pattern matched! Use it directly
-                        classification = {"type": pattern_type, "confidence": 0.85}
-                        logger.info(f"✓ Pattern-based classification: {pattern_type}")
-                    else:
-                        # No pattern match, try Gemini
-                        logger.debug("No pattern match, trying Gemini...")
-                        classification = gemini_client.classify_relationship(
-                            rel.sourceEntity,
-                            rel.targetEntity,
-                            rel.examples,
-                            source_type=source_type,
-                            target_type=target_type
-                        )
-                    
-                    # Update relationship
-                    rel.relationType = classification["type"]
-                    rel.confidence = max(rel.confidence, classification["confidence"])
-                    classified_count += 1
-                    logger.info(f"✓ Classified as '{rel.relationType}' (confidence: {rel.confidence:.2f})")
-                    
-                    # Add delay to avoid rate limiting (except for last item)
-                    if idx < total - 1 and delay_ms > 0:
-                        time.sleep(delay_ms / 1000.0)
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to classify relationship {rel.sourceEntity}-{rel.targetEntity}: {e}")
+            except Exception as e:
+                for _, _, rels in batch:
+                    for rel in rels:
+                        logger.warning("Failed to classify relationship %s-%s: %s", rel.sourceEntity, rel.targetEntity, e)
+                return 0
             
-            enhanced_relationships.append(rel)
+            count = 0
+            for (key, _, rels), classification in zip(batch, classifications):
+                self._llm_cache_put(key, classification)
+                for rel in rels:
+                    apply(rel, classification)
+                    count += 1
+            return count
+        
+        # Unmatched pairs go to Gemini several per call
+        items = [(key, pair, rels) for key, (pair, rels) in pending.items()]
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        classified = await asyncio.gather(*[classify_batch(batch) for batch in batches])
+        classified_count += sum(classified)
         
-        logger.info(f"Classification complete: {classified_count}/{total} relationships classified")
-        return enhanced_relationships
+        logger.info(
+            "Classification complete: %d/%d relationships classified (LLM cache hit rate: %.0f%%)",
+            classified_count, total, self.llm_cache_stats()["hit_rate"] * 100
+        )
+        return list(relationships)
 
+@lru_cache(maxsize=1)
+def get_relationship_classifier() -> RelationshipClassifier:
+    """Return the process-wide RelationshipClassifier, creating it on first use."""
+    return RelationshipClassifier()
@@ -40,9 +40,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_up_models():
+    """
+    Load the spaCy model at startup so the first request does not pay for it.
+    
+    A missing or broken model must not stop the service from starting:
+    the extractor degrades on that path, and the load is retried on first use.
+    """
+    from app.shared.utils.spacy_loader import get_nlp
+    try:
+        get_nlp()
+    except Exception as e:
+        logger.warning(f"spaCy warm-up failed, model will be loaded on first use: {e}")
+
 @app.get("/health")
 async def health_check():
-    return {"status": "ok", "service": "ml-service"}
+    from app.shared.utils.gemini_client import gemini_breaker
+    return {"status": "ok", "service": "ml-service", "gemini_circuit": gemini_breaker.state}
 
 # Import and include routers
 from app.features.organize.routes import router as organize_router
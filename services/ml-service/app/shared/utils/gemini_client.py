@@ -1,12 +1,382 @@
 import os
+import math
+import random
+import re
+import threading
 import time
+import asyncio
 import logging
+import orjson
 import google.generativeai as genai
-from typing import Optional, Any, Callable, List, Dict
+from typing import Optional, Any, Callable, Iterable, List, Dict, Tuple
 from google.api_core import exceptions
+from app.shared.utils.similarity import normalize_text
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of entity pairs classified in one Gemini call
+RELATIONSHIP_BATCH_SIZE = int(os.getenv("GEMINI_RELATIONSHIP_BATCH_SIZE", "8"))
+
+# Request quota (per minute) and typical latency of one Gemini call, used to
+# size how many calls may be in flight at once
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "120"))
+GEMINI_EXPECTED_LATENCY_S = float(os.getenv("GEMINI_EXPECTED_LATENCY_S", "2.0"))
+
+def max_concurrent_calls(rpm: int = GEMINI_RPM, latency_s: float = GEMINI_EXPECTED_LATENCY_S) -> int:
+    """
+    Number of concurrent Gemini calls that uses the whole request quota.
+    
+    By Little's law, calls in flight = request rate x latency; more
+    concurrency than that only runs into the rate limit.
+    """
+    return max(1, math.ceil(rpm / 60 * latency_s))
+
+# Snippets sent per pair: at most MAX_PROMPT_SNIPPETS, within a rough token budget
+MAX_PROMPT_SNIPPETS = 5
+SNIPPET_TOKEN_BUDGET = int(os.getenv("GEMINI_SNIPPET_TOKEN_BUDGET", "400"))
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap token estimate for English text (about 1.3 tokens per word)."""
+    return math.ceil(len(text.split()) * 1.3)
+
+def select_snippets(
+    snippets: List[str],
+    max_snippets: int = MAX_PROMPT_SNIPPETS,
+    token_budget: int = SNIPPET_TOKEN_BUDGET
+) -> List[str]:
+    """
+    Pick the snippets to send to Gemini for one entity pair.
+    
+    Overlapping chunks often repeat the same sentence, so snippets that are
+    equal after normalization are sent once (first occurrence wins), and
+    snippets stop being added once the token budget is used up. The first
+    snippet is always kept.
+    """
+    selected: List[str] = []
+    seen = set()
+    tokens = 0
+    for snippet in snippets:
+        key = normalize_text(snippet)
+        if key in seen:
+            continue
+        cost = _estimate_tokens(snippet)
+        if selected and tokens + cost > token_budget:
+            break
+        seen.add(key)
+        selected.append(snippet)
+        tokens += cost
+        if len(selected) == max_snippets:
+            break
+    return selected
+
+# Relationship types and classification rules shared by the single and batched prompts.
+# Kept at module level, unindented, so no indentation whitespace is sent as tokens.
+RELATIONSHIP_TYPES_GUIDE = """- founded (person founded organization, or founded in year/location)
+- works_at (person works at organization)
+- ceo_of (person is CEO of organization)
+- located_in (entity located in place)
+- headquartered_in (organization HQ in location)
+- uses (entity uses technology/concept)
+- part_of (entity is part of another)
+- authored (person wrote paper/book)
+- created (entity created another)
+- developed (entity developed concept/technology)
+- studied_at (person studied at institution)
+- colleague_of (person works with person)
+- collaborated_with (entities worked together)
+- acquired_by (organization acquired by another)
+- born_in (person born in location)
+- lives_in (person lives in location)
+- related_to (ONLY if no specific type fits)
+
+CRITICAL INSTRUCTIONS:
+1. Look at the TEXT CAREFULLY - if it says "founded", use "founded"
+2. Consider entity types - PERSON+ORGANIZATION often means founded/works_at/ceo_of
+3. ORGANIZATION+LOCATION means located_in or headquartered_in
+4. PREFER SPECIFIC TYPES - only use "related_to" if truly unclear
+5. Return relationship type in LOWERCASE"""
+
+# Guide line for each relationship type in RELATIONSHIP_TYPES_GUIDE, in guide order
+RELATIONSHIP_TYPE_LINES: Dict[str, str] = {
+    line[2:].split(" ", 1)[0]: line
+    for line in RELATIONSHIP_TYPES_GUIDE.splitlines()
+    if line.startswith("- ")
+}
+
+# Likely relationship types per (source type, target type) pair, taken from the
+# guide. A prompt for a known type pair lists only these guide lines (plus
+# related_to) instead of the whole guide, which saves input tokens and narrows
+# what the model has to choose from without introducing new types.
+TYPE_PAIR_SUGGESTIONS: Dict[Tuple[str, str], List[str]] = {
+    ("PERSON", "ORGANIZATION"): ["founded", "works_at", "ceo_of", "studied_at", "collaborated_with"],
+    ("PERSON", "PERSON"): ["colleague_of", "collaborated_with"],
+    ("PERSON", "CONCEPT"): ["uses", "created", "developed"],
+    ("PERSON", "PAPER"): ["authored"],
+    ("PERSON", "LOCATION"): ["located_in", "born_in", "lives_in"],
+    ("ORGANIZATION", "LOCATION"): ["founded", "located_in", "headquartered_in"],
+    ("ORGANIZATION", "ORGANIZATION"): ["founded", "part_of", "collaborated_with", "acquired_by"],
+    ("ORGANIZATION", "CONCEPT"): ["uses", "created", "developed"],
+    ("ORGANIZATION", "DATE"): ["founded"],
+    ("CONCEPT", "CONCEPT"): ["uses", "part_of", "developed"],
+    ("PAPER", "CONCEPT"): ["uses", "created", "developed"],
+}
+
+# Classification rules used with a type-specific menu of relationship types
+SUGGESTED_TYPES_RULES = """Use "related_to" ONLY if none of the other types fits.
+Return relationship type in LOWERCASE."""
+
+RELATIONSHIP_PROMPT = """Analyze the relationship between these two entities based on the text snippets.
+
+Entity 1: {entity1}{type_info}
+Entity 2: {entity2}{type_info2}{entity_type_context}
+
+Context Snippets:
+{snippet_text}
+
+Classify the relationship into ONE of these types (use EXACT lowercase format):
+{types_guide}
+
+Return JSON only (no markdown, no extra text):
+{{"type": "relationship_type", "confidence": 0.8}}"""
+
+RELATIONSHIP_BATCH_PROMPT = """Analyze the relationship between each pair of entities below, based on its text snippets.
+Entity types are given when known.
+
+Pairs:
+{pairs}
+
+{types_guide}
+
+Return a JSON array with exactly one object per pair, using the pair's id:
+[{{"id": 0, "type": "relationship_type", "confidence": 0.8}}]"""
+
+# The single-pair answer is one small JSON object, so cap decoding to it
+# (google-generativeai 0.3.2 has no JSON mode; the format comes from the prompt)
+RELATIONSHIP_CONFIG = {
+    "max_output_tokens": 64,
+    "temperature": 0
+}
+
+# Markdown code fences (```json ... ```) that Gemini may wrap its JSON in
+_JSON_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.MULTILINE)
+
+def _read_streamed_json(response: Iterable[Any]) -> Any:
+    """
+    Parse a streamed JSON object response as soon as it is complete.
+    
+    Chunks are accumulated until they parse as a whole object (ignoring
+    markdown fences), and the rest of the stream (a closing fence, trailing
+    whitespace or text) is not read.
+    """
+    text = ""
+    for chunk in response:
+        text += chunk.text
+        body = _JSON_FENCE_RE.sub("", text).rstrip()
+        if body.endswith("}"):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                # A closing brace inside the object, keep reading
+                continue
+    return orjson.loads(_JSON_FENCE_RE.sub("", text))
+
+class RateLimiter:
+    """
+    Token bucket that paces calls to stay under a requests-per-minute quota.
+    
+    Each call reserves a token. When the bucket is empty the reservation
+    goes into debt and the caller waits until its token has refilled, so
+    waiting callers are served in order. Shared by threads and event loops alike.
+    """
+    
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60
+        # Allow a burst of about one second's worth of calls
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        """Refill the bucket."""
+        with self._lock:
+            self._tokens = self.capacity
+            self._updated = time.monotonic()
+    
+    def _reserve(self) -> float:
+        """Take a token and return how many seconds to wait until it is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+    
+    def acquire(self) -> None:
+        """Wait (blocking) for a token."""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            time.sleep(wait_time)
+    
+    async def acquire_async(self) -> None:
+        """Wait for a token without blocking the event loop."""
+        wait_time = self._reserve()
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+# Client-side pacing at 90% of the request quota, so calls are spread out
+# before the server starts rejecting them with 429s
+gemini_limiter = RateLimiter(rate_per_minute=GEMINI_RPM * 0.9)
+
+# One (entity1, entity2, snippets, source_type, target_type) pair to classify
+RelationshipPair = Tuple[str, str, List[str], Optional[str], Optional[str]]
+
+# google-generativeai 0.3.2 has no JSON mode (response_mime_type / response_schema),
+# so the JSON format comes from the prompt and only decoding is configured here
+RELATIONSHIP_BATCH_CONFIG = {
+    "temperature": 0
+}
+
+# Retry policy for transient Gemini errors
+MAX_RETRIES = 5
+BASE_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 32.0
+
+def _server_retry_delay(error: exceptions.GoogleAPICallError) -> Optional[float]:
+    """
+    Get the delay the server asked for, from a Retry-After header or a RetryInfo detail.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            return float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            pass
+    
+    for detail in getattr(error, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None:
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+    return None
+
+def _retry_delay(error: exceptions.GoogleAPICallError, attempt: int) -> float:
+    """
+    Seconds to wait before retrying after a transient error.
+    
+    Uses the server's requested delay when there is one, otherwise
+    exponential backoff with jitter, so concurrent callers that failed
+    together do not all retry at the same instant. Capped at MAX_RETRY_DELAY.
+    """
+    server_delay = _server_retry_delay(error)
+    if server_delay is not None:
+        wait_time = min(MAX_RETRY_DELAY, server_delay)
+    else:
+        wait_time = min(MAX_RETRY_DELAY, BASE_RETRY_DELAY * (2 ** attempt)) * random.uniform(0.5, 1.0)
+    
+    reason = "rate limit hit" if isinstance(error, exceptions.ResourceExhausted) else "service unavailable"
+    logger.warning(f"Gemini {reason}. Retrying in {wait_time:.1f}s (Attempt {attempt + 1}/{MAX_RETRIES})")
+    return wait_time
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Fail fast while Gemini is down instead of retrying every call against it.
+    
+    After fail_max consecutive outage failures (503s, or calls that ran out of
+    retries) the circuit opens and calls are refused for reset_timeout seconds.
+    Then it is half-open: one probe call is let through, and its outcome closes the circuit or opens it again.
+    Shared by all GeminiClient instances, so it is thread-safe.
+    """
+    
+    def __init__(self, fail_max: int = 5, reset_timeout: float = 60.0):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        """Close the circuit and forget past failures."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+    
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half_open'."""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+    
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the probe when half-open)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._probing:
+                return False
+            self._probing = True
+            return True
+    
+    def record_success(self) -> None:
+        """Gemini answered: close the circuit."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+    
+    def record_failure(self) -> None:
+        """An outage failure: open the circuit at fail_max, or again after a failed probe."""
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._opened_at is not None or self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+    
+    def release(self) -> None:
+        """Give up a claimed probe without a verdict (the call failed for another reason)."""
+        with self._lock:
+            self._probing = False
+
+gemini_breaker = CircuitBreaker(
+    fail_max=int(os.getenv("GEMINI_BREAKER_FAIL_MAX", "5")),
+    reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET_TIMEOUT_S", "60"))
+)
+
+# API key genai is currently configured with. genai.configure() drops the SDK's
+# cached clients, so reconfiguring on every GeminiClient() would open a new
+# gRPC channel (and TLS handshake) per request instead of reusing one.
+_configured_api_key: Optional[str] = None
+
+def _configure(api_key: str) -> None:
+    """Configure genai with api_key, unless it is already configured with it."""
+    global _configured_api_key
+    if _configured_api_key == api_key:
+        return
+    logger.debug("Configuring Gemini API...")
+    genai.configure(api_key=api_key)
+    _configured_api_key = api_key
+
+# Use available model found during testing
+GEMINI_MODEL_NAME = 'gemini-2.0-flash-lite-preview-02-05'
+
+# GenerativeModel per API key, shared by every GeminiClient so requests do not
+# each build their own (a model keeps the SDK client it was first used with)
+_models: Dict[str, genai.GenerativeModel] = {}
+
+def _get_model(api_key: str) -> genai.GenerativeModel:
+    """Get the shared GenerativeModel for api_key, configuring genai and creating it on first use."""
+    _configure(api_key)
+    model = _models.get(api_key)
+    if model is None:
+        logger.debug("Creating GenerativeModel...")
+        model = _models[api_key] = genai.GenerativeModel(GEMINI_MODEL_NAME)
+    return model
+
 class GeminiClient:
     """
     Wrapper for Google Gemini API with robustness features.
@@ -14,7 +384,7 @@ class GeminiClient:
     """
     
     def __init__(self, api_key: Optional[str] = None):
-        logger.info("GeminiClient Initialization")
+        logger.debug("GeminiClient Initialization")
         
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         
@@ -24,16 +394,12 @@ class GeminiClient:
             self.model = None
             return
 
-        logger.info(f"GEMINI_API_KEY found (length: {len(self.api_key)})")
-        logger.debug(f"First 10 chars: {self.api_key[:10]}...")
+        logger.debug(f"GEMINI_API_KEY found (length: {len(self.api_key)})")
         
         try:
-            logger.debug("Configuring Gemini API...")
-            genai.configure(api_key=self.api_key)
-            logger.debug("Creating GenerativeModel...")
-            # Use available model found during testing
-            self.model = genai.GenerativeModel('gemini-2.0-flash-lite-preview-02-05')
-            logger.info("GeminiClient initialized successfully.")
+            # Cheap after the first client: the configured SDK and model are shared
+            self.model = _get_model(self.api_key)
+            logger.debug("GeminiClient initialized successfully.")
         except Exception as e:
             logger.error(f"Failed to initialize GeminiClient: {e}")
             self.model = None
@@ -42,27 +408,67 @@ class GeminiClient:
         """
         Executes a function with retry logic for transient errors.
         Retries on 429 (Resource Exhausted) and 503 (Service Unavailable).
+        Raises CircuitOpenError without calling func while gemini_breaker is open.
+        Every attempt is paced by gemini_limiter.
         """
-        max_retries = 3
-        base_delay = 1.0
+        for attempt in range(MAX_RETRIES):
+            if not gemini_breaker.allow():
+                raise CircuitOpenError("Gemini circuit breaker is open, skipping call")
+            gemini_limiter.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except (exceptions.ResourceExhausted, exceptions.ServiceUnavailable) as e:
+                # 429s are backpressure, not an outage: only 503s and calls that
+                # run out of retries count toward opening the circuit
+                if isinstance(e, exceptions.ServiceUnavailable) or attempt == MAX_RETRIES - 1:
+                    gemini_breaker.record_failure()
+                else:
+                    gemini_breaker.release()
+                if attempt == MAX_RETRIES - 1:
+                    break
+                time.sleep(_retry_delay(e, attempt))
+            except Exception as e:
+                # For other errors, log and re-raise immediately
+                gemini_breaker.release()
+                logger.error(f"Gemini API error: {e}")
+                raise
+            else:
+                gemini_breaker.record_success()
+                return result
         
-        for attempt in range(max_retries):
+        raise Exception(f"Gemini API failed after {MAX_RETRIES} retries")
+
+    async def _call_with_retry_async(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Async version of _call_with_retry for coroutine functions.
+        Waits between retries without blocking the event loop.
+        """
+        for attempt in range(MAX_RETRIES):
+            if not gemini_breaker.allow():
+                raise CircuitOpenError("Gemini circuit breaker is open, skipping call")
+            await gemini_limiter.acquire_async()
             try:
-                return func(*args, **kwargs)
-            except exceptions.ResourceExhausted:
-                wait_time = base_delay * (2 ** attempt)
-                logger.warning(f"Gemini rate limit hit. Retrying in {wait_time}s (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-            except exceptions.ServiceUnavailable:
-                wait_time = base_delay * (2 ** attempt)
-                logger.warning(f"Gemini service unavailable. Retrying in {wait_time}s (Attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
+                result = await func(*args, **kwargs)
+            except (exceptions.ResourceExhausted, exceptions.ServiceUnavailable) as e:
+                # 429s are backpressure, not an outage: only 503s and calls that
+                # run out of retries count toward opening the circuit
+                if isinstance(e, exceptions.ServiceUnavailable) or attempt == MAX_RETRIES - 1:
+                    gemini_breaker.record_failure()
+                else:
+                    gemini_breaker.release()
+                if attempt == MAX_RETRIES - 1:
+                    break
+                await asyncio.sleep(_retry_delay(e, attempt))
             except Exception as e:
                 # For other errors, log and re-raise immediately
+                gemini_breaker.release()
                 logger.error(f"Gemini API error: {e}")
                 raise
+            else:
+                gemini_breaker.record_success()
+                return result
         
-        raise Exception(f"Gemini API failed after {max_retries} retries")
+        raise Exception(f"Gemini API failed after {MAX_RETRIES} retries")
 
     def extract_entities(self, text: str, existing_entities: List[Dict] = []) -> Dict:
         """
@@ -83,6 +489,40 @@ class GeminiClient:
         logger.info(f"Gemini extraction requested for text length {len(text)}")
         return {}
 
+    def _get_type_specific_suggestions(self, source_type: Optional[str], target_type: Optional[str]) -> List[str]:
+        """
+        Suggest likely relationship types based on entity type combinations.
+        
+        Args:
+            source_type: Type of source entity (PERSON, ORGANIZATION, etc.)
+            target_type: Type of target entity
+            
+        Returns:
+            List of suggested relationship types (empty for unknown combinations)
+        """
+        if not source_type or not target_type:
+            return []
+        
+        # Normalize types to uppercase
+        src = source_type.upper()
+        tgt = target_type.upper()
+        
+        # Try both directions
+        suggestions = TYPE_PAIR_SUGGESTIONS.get((src, tgt), [])
+        if not suggestions:
+            suggestions = TYPE_PAIR_SUGGESTIONS.get((tgt, src), [])
+        
+        return suggestions
+
+    def _suggested_types(self, source_type: Optional[str], target_type: Optional[str]) -> List[str]:
+        """
+        Menu of relationship types to offer for a type pair: its suggestions plus related_to.
+        
+        Empty for unknown type combinations, which get the full RELATIONSHIP_TYPES_GUIDE.
+        """
+        suggestions = self._get_type_specific_suggestions(source_type, target_type)
+        return list(dict.fromkeys(suggestions + ["related_to"])) if suggestions else []
+
     def classify_relationship(
         self,
         entity1: str,
@@ -113,9 +553,7 @@ class GeminiClient:
             logger.warning(f"No snippets provided for {entity1}-{entity2}, returning default")
             return {"type": "related_to", "confidence": 0.5}
 
-        # Safety check for snippets
-        safe_snippets = snippets if snippets else []
-        snippet_text = "\n".join([f"- {s}" for s in safe_snippets[:5]])
+        snippet_text = "\n".join([f"- {s}" for s in select_snippets(snippets)])
         
         # Build entity type context
         type_info = ""
@@ -128,62 +566,43 @@ class GeminiClient:
             type_info2 = ""
             entity_type_context = ""
 
-        prompt = f"""
-        Analyze the relationship between these two entities based on the text snippets.
-        
-        Entity 1: {entity1}{type_info}
-        Entity 2: {entity2}{type_info2}{entity_type_context}
-        
-        Context Snippets:
-        {snippet_text}
-        
-        Classify the relationship into ONE of these types (use EXACT lowercase format):
-        - founded (person founded organization, or founded in year/location)
-        - works_at (person works at organization)
-        - ceo_of (person is CEO of organization)
-        - located_in (entity located in place)
-        - headquartered_in (organization HQ in location)
-        - uses (entity uses technology/concept)
-        - part_of (entity is part of another)
-        - authored (person wrote paper/book)
-        - created (entity created another)
-        - developed (entity developed concept/technology)
-        - studied_at (person studied at institution)
-        - colleague_of (person works with person)
-        - collaborated_with (entities worked together)
-        - acquired_by (organization acquired by another)
-        - born_in (person born in location)
-        - lives_in (person lives in location)
-        - related_to (ONLY if no specific type fits)
-        
-        CRITICAL INSTRUCTIONS:
-        1. Look at the TEXT CAREFULLY - if it says "founded", use "founded"
-        2. Consider entity types - PERSON+ORGANIZATION often means founded/works_at/ceo_of
-        3. ORGANIZATION+LOCATION means located_in or headquartered_in
-        4. PREFER SPECIFIC TYPES - only use "related_to" if truly unclear
-        5. Return relationship type in LOWERCASE
-        
-        Return JSON only (no markdown, no extra text):
-        {{
-            "type": "relationship_type",
-            "confidence": 0.8
-        }}
-        """
+        # Known type pairs get a short menu of their likely types instead of the full guide
+        suggested_types = self._suggested_types(source_type, target_type)
+        if suggested_types:
+            menu = "\n".join(RELATIONSHIP_TYPE_LINES[rel_type] for rel_type in suggested_types)
+            types_guide = f"{menu}\n\n{SUGGESTED_TYPES_RULES}"
+        else:
+            types_guide = RELATIONSHIP_TYPES_GUIDE
+
+        prompt = RELATIONSHIP_PROMPT.format(
+            entity1=entity1,
+            type_info=type_info,
+            entity2=entity2,
+            type_info2=type_info2,
+            entity_type_context=entity_type_context,
+            snippet_text=snippet_text,
+            types_guide=types_guide
+        )
         
         try:
             logger.info(f"Classifying: {entity1} ({source_type or '?'}) <-> {entity2} ({target_type or '?'})")
             logger.debug(f"Snippets: {snippets[:1]}")  # Log first snippet
             
-            response = self._call_with_retry(
-                self.model.generate_content,
-                prompt,
-                generation_config={"response_mime_type": "application/json"}
-            )
+            # Stream the response and stop reading once the JSON object is complete.
+            # The stream is read inside the retried call, so errors raised mid-stream
+            # are retried and counted by the circuit breaker like failed calls.
+            def generate_and_read() -> Any:
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=RELATIONSHIP_CONFIG,
+                    stream=True
+                )
+                return _read_streamed_json(response)
+            
+            result = self._call_with_retry(generate_and_read)
             
-            logger.info(f"Gemini response: {response.text}")
+            logger.info(f"Gemini response: {result}")
             
-            import json
-            result = json.loads(response.text)
             classification = {
                 "type": result.get("type", "related_to").lower(),
                 "confidence": float(result.get("confidence", 0.5))
@@ -193,3 +612,124 @@ class GeminiClient:
         except Exception as e:
             logger.error(f"Classification failed for {entity1}-{entity2}: {e}", exc_info=True)
             return {"type": "related_to", "confidence": 0.5}
+
+    def classify_relationships_batch(self, pairs: List[RelationshipPair]) -> List[dict]:
+        """
+        Classify several entity pairs with a single Gemini call.
+        
+        Pairs are sent as a JSON array with integer ids, and Gemini answers
+        with one {id, type, confidence} object per pair, so the per-call
+        overhead is paid once per batch instead of once per pair.
+        
+        Args:
+            pairs: (entity1, entity2, snippets, source_type, target_type) tuples,
+                at most RELATIONSHIP_BATCH_SIZE of them.
+            
+        Returns:
+            List of dicts with 'type' and 'confidence' keys, parallel to pairs
+            (the default 'related_to' for pairs Gemini did not classify).
+        """
+        if not pairs:
+            return []
+        
+        if not self.model:
+            logger.error("GeminiClient model is None - API key may not be loaded. Returning default 'related_to'.")
+            return self._default_classifications(len(pairs))
+        
+        try:
+            logger.info(f"Classifying batch of {len(pairs)} relationships")
+            response = self._call_with_retry(
+                self.model.generate_content,
+                self._relationship_batch_prompt(pairs),
+                generation_config=RELATIONSHIP_BATCH_CONFIG
+            )
+            return self._parse_relationship_batch(response.text, len(pairs))
+        except Exception as e:
+            logger.error(f"Batch classification failed for {len(pairs)} relationships: {e}", exc_info=True)
+            return self._default_classifications(len(pairs))
+
+    async def classify_relationships_batch_async(self, pairs: List[RelationshipPair]) -> List[dict]:
+        """
+        Async version of classify_relationships_batch.
+        
+        Uses the SDK's native async call, so concurrent batches do not each
+        tie up a worker thread while waiting on the network.
+        """
+        if not pairs:
+            return []
+        
+        if not self.model:
+            logger.error("GeminiClient model is None - API key may not be loaded. Returning default 'related_to'.")
+            return self._default_classifications(len(pairs))
+        
+        try:
+            logger.info(f"Classifying batch of {len(pairs)} relationships")
+            response = await self._call_with_retry_async(
+                self.model.generate_content_async,
+                self._relationship_batch_prompt(pairs),
+                generation_config=RELATIONSHIP_BATCH_CONFIG
+            )
+            return self._parse_relationship_batch(response.text, len(pairs))
+        except Exception as e:
+            logger.error(f"Batch classification failed for {len(pairs)} relationships: {e}", exc_info=True)
+            return self._default_classifications(len(pairs))
+
+    @staticmethod
+    def _default_classifications(count: int) -> List[dict]:
+        """Default 'related_to' classifications for pairs that could not be classified."""
+        return [{"type": "related_to", "confidence": 0.5} for _ in range(count)]
+
+    def _relationship_batch_prompt(self, pairs: List[RelationshipPair]) -> str:
+        """
+        Build the batched classification prompt, giving each pair its index as id.
+        
+        Pairs of a known type combination carry their own short "types" menu;
+        the full guide is only included when some pair has none.
+        """
+        items = []
+        for pair_id, (entity1, entity2, snippets, source_type, target_type) in enumerate(pairs):
+            item = {
+                "id": pair_id,
+                "entity1": entity1,
+                "entity1_type": source_type,
+                "entity2": entity2,
+                "entity2_type": target_type,
+                "snippets": select_snippets(snippets)
+            }
+            suggested_types = self._suggested_types(source_type, target_type)
+            if suggested_types:
+                item["types"] = suggested_types
+            items.append(item)
+        
+        guided = sum("types" in item for item in items)
+        sections = []
+        if guided:
+            sections.append(
+                'For a pair with a "types" list, classify its relationship into ONE of those types.\n'
+                f"{SUGGESTED_TYPES_RULES}"
+            )
+        if guided < len(items):
+            which = "each other relationship" if guided else "each relationship"
+            sections.append(f"Classify {which} into ONE of these types (use EXACT lowercase format):\n{RELATIONSHIP_TYPES_GUIDE}")
+        
+        return RELATIONSHIP_BATCH_PROMPT.format(
+            pairs=orjson.dumps(items).decode(),
+            types_guide="\n\n".join(sections)
+        )
+
+    def _parse_relationship_batch(self, text: str, count: int) -> List[dict]:
+        """
+        Scatter a batched classification response back to pair order.
+        
+        Pairs missing from the response keep the default classification.
+        """
+        results = self._default_classifications(count)
+        for result in orjson.loads(_JSON_FENCE_RE.sub("", text)):
+            pair_id = result.get("id")
+            if not isinstance(pair_id, int) or not 0 <= pair_id < count:
+                continue
+            results[pair_id] = {
+                "type": str(result.get("type", "related_to")).lower(),
+                "confidence": float(result.get("confidence", 0.5))
+            }
+        return results
@@ -1,8 +1,25 @@
-import re
 import math
-from difflib import SequenceMatcher
-from typing import List, Optional
+import re
+from functools import lru_cache
+from typing import List, Optional, Sequence, Union
+import numpy as np
+from rapidfuzz import fuzz
+
+# Characters normalize_text removes: anything that is not a word character or whitespace
+_NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+
+# Same removal for ASCII text as a str.translate table (a C table lookup per character)
+_ASCII_NON_WORD_TABLE = str.maketrans('', '', ''.join(
+    chr(code) for code in range(128) if _NON_WORD_PATTERN.match(chr(code))
+))
+
+# Below this many components, plain Python arithmetic beats NumPy's call overhead
+SMALL_VECTOR_SIZE = 32
+
+# Distinct texts whose normalized form is memoized (entity names recur across comparisons)
+NORMALIZE_CACHE_SIZE = 4096
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_text(text: str) -> str:
     """
     Normalize text for comparison by converting to lowercase and removing punctuation.
@@ -20,23 +37,32 @@ def normalize_text(text: str) -> str:
         'machine learning'
     """
     # Remove all non-alphanumeric characters except spaces
-    normalized = re.sub(r'[^\w\s]', '', text.lower())
+    lowered = text.lower()
+    if lowered.isascii():
+        normalized = lowered.translate(_ASCII_NON_WORD_TABLE)
+    else:
+        normalized = _NON_WORD_PATTERN.sub('', lowered)
     return normalized.strip()
 
-def string_similarity(text1: str, text2: str) -> float:
+def string_similarity(text1: str, text2: str, score_cutoff: float = 0.0) -> float:
     """
-    Calculate string similarity using SequenceMatcher (Levenshtein-like ratio).
+    Calculate string similarity using RapidFuzz's normalized InDel ratio (Levenshtein-like).
+    
+    Same scorer as the deduplication engine's batched cdist pass, so the
+    scalar and batched paths agree.
     
     Args:
         text1: First text string.
         text2: Second text string.
+        score_cutoff: Minimum similarity of interest (0.0-1.0). RapidFuzz
+            stops computing the edit distance as soon as it cannot reach it.
         
     Returns:
-        Similarity ratio between 0.0 and 1.0.
+        Similarity ratio between 0.0 and 1.0 (0.0 if below score_cutoff).
         
     Example:
         >>> string_similarity("AI", "A.I.")
-        0.6666666666666666
+        1.0
         >>> string_similarity("ai", "AI")
         1.0
     """
@@ -44,16 +70,16 @@ def string_similarity(text1: str, text2: str) -> float:
     norm1 = normalize_text(text1)
     norm2 = normalize_text(text2)
     
-    # Calculate similarity ratio
-    return SequenceMatcher(None, norm1, norm2).ratio()
+    # Calculate similarity ratio (RapidFuzz scores are 0-100)
+    return fuzz.ratio(norm1, norm2, score_cutoff=score_cutoff * 100) / 100
 
-def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
+def cosine_similarity(vec1: Union[List[float], np.ndarray], vec2: Union[List[float], np.ndarray]) -> float:
     """
     Calculate cosine similarity between two vectors.
     
     Args:
-        vec1: First vector (list of floats).
-        vec2: Second vector (list of floats).
+        vec1: First vector (list of floats or 1-D array).
+        vec2: Second vector (list of floats or 1-D array).
         
     Returns:
         Cosine similarity between -1.0 and 1.0.
@@ -73,19 +99,77 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     if len(vec1) == 0:
         raise ValueError("Vectors cannot be empty")
     
-    # Calculate dot product
-    dot_product = sum(a * b for a, b in zip(vec1, vec2))
-    
-    # Calculate magnitudes
-    magnitude1 = math.sqrt(sum(a * a for a in vec1))
-    magnitude2 = math.sqrt(sum(b * b for b in vec2))
+    if len(vec1) < SMALL_VECTOR_SIZE and not isinstance(vec1, np.ndarray) and not isinstance(vec2, np.ndarray):
+        # Tiny lists: one fused Python loop, no array conversion
+        dot = squared1 = squared2 = 0.0
+        for x, y in zip(vec1, vec2):
+            dot += x * y
+            squared1 += x * x
+            squared2 += y * y
+        squared_magnitudes = squared1 * squared2
+    else:
+        # One conversion and one Gram product give the dot product and both
+        # squared magnitudes together, instead of three separate reductions
+        pair = np.array((vec1, vec2), dtype=np.float64)
+        gram = pair @ pair.T
+        dot = gram[0, 1]
+        squared_magnitudes = gram[0, 0] * gram[1, 1]
     
     # Avoid division by zero
-    if magnitude1 == 0 or magnitude2 == 0:
+    if squared_magnitudes == 0:
         return 0.0
     
     # Calculate cosine similarity
-    return dot_product / (magnitude1 * magnitude2)
+    return float(dot / math.sqrt(squared_magnitudes))
+
+def cosine_similarity_matrix(
+    query: Union[Sequence[float], np.ndarray],
+    corpus: Union[Sequence[Sequence[float]], np.ndarray]
+) -> np.ndarray:
+    """
+    Calculate cosine similarity between one vector and every row of a matrix.
+    
+    One matrix-vector product instead of a cosine_similarity call per row.
+    
+    Args:
+        query: Query vector of dimension D.
+        corpus: (N, D) matrix (or list of N vectors).
+        
+    Returns:
+        Float32 array of N similarities (0.0 for zero vectors).
+        
+    Raises:
+        ValueError: If the dimensions do not match.
+    """
+    q = np.asarray(query, dtype=np.float32)
+    m = np.asarray(corpus, dtype=np.float32)
+    if m.ndim != 2 or m.shape[1] != q.shape[0]:
+        raise ValueError(f"Vectors must have same dimensions: {q.shape[0]} vs {m.shape[-1]}")
+    
+    norms = np.linalg.norm(m, axis=1) * np.linalg.norm(q)
+    dots = m @ q
+    
+    # Avoid division by zero
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0)
+
+def build_embedding_matrix(vectors: Union[Sequence[Sequence[float]], np.ndarray]) -> np.ndarray:
+    """
+    Stack vectors into a contiguous float32 matrix with L2-normalized rows.
+    
+    With normalized rows, cosine similarity is a plain dot product, so a
+    whole similarity matrix is one matmul (M @ M.T) and no magnitude is
+    recomputed per pair.
+    
+    Args:
+        vectors: (N, D) matrix or list of N vectors of equal dimension.
+        
+    Returns:
+        (N, D) float32 matrix. Zero vectors have no direction and stay zero
+        rows (similarity 0 with everything).
+    """
+    matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
 
 def is_abbreviation(short: str, long: str, max_length: int = 5) -> bool:
     """
@@ -113,9 +197,40 @@ def is_abbreviation(short: str, long: str, max_length: int = 5) -> bool:
         >>> is_abbreviation("Python", "Python Programming")
         False  # Too long to be abbreviation
     """
-    norm_short = normalize_text(short)
-    norm_long = normalize_text(long)
+    return is_normalized_abbreviation(normalize_text(short), normalize_text(long), max_length=max_length)
+
+def initials_of(normalized: str) -> str:
+    """
+    Get the first letters of each word in an already normalized text.
+    
+    Example:
+        >>> initials_of("artificial intelligence")
+        'ai'
+    """
+    # A list comprehension joins faster than a generator (join builds a list anyway)
+    return ''.join([word[0] for word in normalized.split()])
+
+def is_normalized_abbreviation(
+    norm_short: str,
+    norm_long: str,
+    long_initials: Optional[str] = None,
+    max_length: int = 5
+) -> bool:
+    """
+    Same check as is_abbreviation, on texts that are already normalized.
+    
+    Lets callers comparing the same names many times normalize them (and
+    compute their initials) once up front.
     
+    Args:
+        norm_short: Normalized potential abbreviation.
+        norm_long: Normalized full form.
+        long_initials: initials_of(norm_long), computed here if not given.
+        max_length: Maximum length for abbreviation (default: 5).
+        
+    Returns:
+        True if short is an abbreviation of long, False otherwise.
+    """
     # Check if short is actually short enough
     if len(norm_short) > max_length:
         return False
@@ -126,12 +241,8 @@ def is_abbreviation(short: str, long: str, max_length: int = 5) -> bool:
         return True
     
     # Pattern 2: Initials match
-    # Extract first letters of each word in long
-    words = norm_long.split()
-    if len(words) > 0:
-        initials = ''.join(word[0] for word in words if len(word) > 0)
-        if norm_short == initials:
-            return True
-    
-    return False
+    # First letters of each word in long
+    if long_initials is None:
+        long_initials = initials_of(norm_long)
+    return len(long_initials) > 0 and norm_short == long_initials
 
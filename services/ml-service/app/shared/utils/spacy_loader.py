@@ -1,30 +1,72 @@
+import os
 import spacy
 import logging
-from typing import Optional
+import threading
+from typing import List, Optional
+from spacy.tokens import Doc
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 _nlp_instance: Optional[spacy.language.Language] = None
+_nlp_lock = threading.Lock()
+
+# Only NER is used; tok2vec must stay because ner listens to it.
+# SPACY_DISABLED_COMPONENTS (comma-separated, empty for none) overrides the list.
+DISABLED_COMPONENTS = [
+    name.strip()
+    for name in os.getenv("SPACY_DISABLED_COMPONENTS", "tagger,parser,attribute_ruler,lemmatizer").split(",")
+    if name.strip()
+]
+
+# Number of texts nlp.pipe processes per batch
+SPACY_BATCH_SIZE = 64
 
 def get_nlp() -> spacy.language.Language:
     """
     Singleton function to load and return the spaCy NLP model.
-    Loads 'en_core_web_sm' if not already loaded.
+    Loads 'en_core_web_sm' if not already loaded, with the components
+    that entity extraction does not need disabled.
+    
+    Thread-safe: concurrent first callers wait for a single load instead
+    of each loading their own copy of the model.
     """
     global _nlp_instance
     
-    if _nlp_instance is None:
-        try:
-            logger.info("Loading spaCy model 'en_core_web_sm'...")
-            _nlp_instance = spacy.load("en_core_web_sm")
-            logger.info("spaCy model loaded successfully.")
-        except OSError:
-            logger.error("spaCy model 'en_core_web_sm' not found. Please run 'python -m spacy download en_core_web_sm'")
-            raise
-        except Exception as e:
-            logger.error(f"Failed to load spaCy model: {e}")
-            raise
+    if _nlp_instance is not None:
+        return _nlp_instance
+    
+    with _nlp_lock:
+        if _nlp_instance is None:
+            try:
+                logger.info("Loading spaCy model 'en_core_web_sm'...")
+                _nlp_instance = spacy.load("en_core_web_sm", disable=DISABLED_COMPONENTS)
+                logger.info(f"spaCy model loaded successfully (disabled: {', '.join(DISABLED_COMPONENTS) or 'none'}).")
+            except OSError:
+                logger.error("spaCy model 'en_core_web_sm' not found. Please run 'python -m spacy download en_core_web_sm'")
+                raise
+            except Exception as e:
+                logger.error(f"Failed to load spaCy model: {e}")
+                raise
 
     return _nlp_instance
+
+def run_ner_batch(texts: List[str]) -> List[Doc]:
+    """
+    Run the pipeline over many texts at once with nlp.pipe.
+    
+    Batching amortizes the per-call overhead and runs tok2vec over a whole
+    batch at a time.
+    
+    Always runs in this process: callers reach it through asyncio.to_thread,
+    and forking worker processes (n_process > 1) from a threaded process that
+    holds open gRPC channels can deadlock.
+    
+    Args:
+        texts: Texts to process.
+        
+    Returns:
+        One Doc per text, in input order.
+    """
+    return list(get_nlp().pipe(texts, batch_size=SPACY_BATCH_SIZE, n_process=1))
@@ -0,0 +1,20 @@
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    """
+    One TestClient (and app startup) shared by every test in the session.
+    
+    The startup spaCy warm-up is patched out so route tests, which mock
+    extraction, do not depend on the real model being installed.
+    """
+    from app.main import app
+    with patch("app.shared.utils.spacy_loader.get_nlp"):
+        test_client = TestClient(app)
+        test_client.__enter__()
+    try:
+        yield test_client
+    finally:
+        test_client.__exit__(None, None, None)
@@ -1,8 +1,12 @@
 import pytest
+import numpy as np
 from app.features.organize.schemas.extract import ExtractedEntity, EntitySourceSnippet
 from app.features.organize.services.deduplication_engine import (
     should_merge,
-    deduplicate_entities
+    deduplicate_entities,
+    _embedding_matrix,
+    _quantize,
+    _similar_embedding_pairs
 )
 
 # Helper to create test entities
@@ -153,6 +157,58 @@ def test_deduplicate_entities_sources_merged():
     # Should have sources from both
     assert len(result[0].sources) == 2
 
+def test_deduplicate_entities_does_not_chain_merges():
+    """Test that entities only merge into the first entity they match."""
+    entities = [
+        create_entity("Neural Networks", "CONCEPT", 0.9),
+        create_entity("Deep Learning", "CONCEPT", 0.8),
+        create_entity("Representation Learning", "CONCEPT", 0.7),
+    ]
+    # 1-2 and 2-3 pass the cosine threshold, 1-3 does not
+    embeddings = [[1.0, 0.0], [0.94, 0.34], [0.77, 0.64]]
+    
+    result = deduplicate_entities(entities, embeddings)
+    
+    assert [e.name for e in result] == ["Neural Networks", "Representation Learning"]
+    assert result[0].aliases == ["Deep Learning"]
+
+def test_deduplicate_entities_short_name_is_not_a_hub():
+    """Test that a short name does not pull unrelated names together."""
+    entities = [create_entity(name, "PERSON") for name in ["Brian Adams", "Ian", "Ian Fleming", "Adrian Ross"]]
+    result = deduplicate_entities(entities, [None] * len(entities))
+    assert [e.name for e in result] == ["Brian Adams", "Ian Fleming", "Adrian Ross"]
+    
+    entities = [create_entity(name, "PERSON") for name in ["Joanna Smith", "Ann", "Annette Brown"]]
+    result = deduplicate_entities(entities, [None] * len(entities))
+    assert [e.name for e in result] == ["Joanna Smith", "Annette Brown"]
+
+def test_deduplicate_entities_borderline_cosine_is_exact():
+    """Test that pairs near the cosine threshold are decided on exact similarity."""
+    rng = np.random.default_rng(7)
+    u, w = np.linalg.qr(rng.normal(size=(768, 2)))[0].T
+    
+    for cosine, merged in [(0.895, False), (0.905, True)]:
+        entities = [create_entity("Stellar Nursery", "CONCEPT"), create_entity("Molecular Cloud", "CONCEPT")]
+        embeddings = [u.tolist(), (cosine * u + np.sqrt(1 - cosine ** 2) * w).tolist()]
+        
+        result = deduplicate_entities(entities, embeddings)
+        assert (len(result) == 1) is merged
+
+def test_similar_embedding_pairs_match_float32_decisions():
+    """Test that int8 screening selects exactly the pairs the float32 cosine would."""
+    rng = np.random.default_rng(11)
+    base = rng.normal(size=768)
+    # Noise scaled so pairwise cosines spread around the threshold
+    vectors = base + rng.normal(size=(60, 768)) * rng.uniform(0.2, 0.5, size=(60, 1))
+    
+    matrix, mask = _embedding_matrix(vectors.astype(np.float32), None)
+    pairs = _similar_embedding_pairs(list(range(60)), matrix, _quantize(matrix), mask)
+    
+    cosines = matrix @ matrix.T
+    expected = {(i, j) for i in range(60) for j in range(i + 1, 60) if cosines[i, j] >= 0.90}
+    assert 0 < len(expected) < 60 * 59 // 2
+    assert set(pairs) == expected
+
 def test_deduplicate_entities_empty():
     """Test with empty input."""
     result = deduplicate_entities([], [])
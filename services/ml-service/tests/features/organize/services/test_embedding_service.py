@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from unittest.mock import MagicMock, patch
 from app.features.organize.services.embedding_service import EmbeddingService
@@ -5,7 +6,7 @@ from app.features.organize.services.embedding_service import EmbeddingService
 def test_embedding_service_init():
     """Test EmbeddingService initialization."""
     service = EmbeddingService()
-    assert service.BATCH_SIZE == 10
+    assert service.BATCH_SIZE == 100
     assert service.EMBEDDING_DIMENSIONS == 768
 
 def test_generate_embeddings_success():
@@ -30,6 +31,8 @@ def test_generate_embeddings_success():
         assert embeddings[1] is not None
         assert len(embeddings[0]) == 768
         assert len(embeddings[1]) == 768
+        # Embeddings come back L2-normalized
+        assert sum(x * x for x in embeddings[0]) == pytest.approx(1.0, abs=1e-5)
 
 def test_generate_embeddings_failure():
     """Test embedding generation with API failure."""
@@ -48,7 +51,7 @@ def test_generate_embeddings_failure():
         assert embeddings[1] is None
 
 def test_generate_embeddings_batch_processing():
-    """Test batch processing with >10 texts."""
+    """Test batch processing with >100 texts."""
     # Mock response for batches - returns list of embeddings
     def mock_embed(*args, **kwargs):
         content = kwargs.get('content', [])
@@ -60,13 +63,75 @@ def test_generate_embeddings_batch_processing():
         mock_instance._call_with_retry = MagicMock(side_effect=mock_embed)
         
         service = EmbeddingService()
-        texts = [f"text_{i}" for i in range(25)]  # 25 texts = 3 batches
+        texts = [f"text_{i}" for i in range(250)]  # 250 texts = 3 batches
         embeddings = service.generate_embeddings(texts)
         
-        assert len(embeddings) == 25
+        assert len(embeddings) == 250
+        assert mock_instance._call_with_retry.call_count == 3
         # All should succeed
         assert all(e is not None for e in embeddings)
 
+def test_generate_embeddings_cache():
+    """Test that repeated texts are embedded only once."""
+    def mock_embed(*args, **kwargs):
+        content = kwargs.get('content', [])
+        return [[0.1] * 768 for _ in content]
+    
+    with patch('app.features.organize.services.embedding_service.GeminiClient') as MockClient:
+        mock_instance = MockClient.return_value
+        mock_instance.model = MagicMock()
+        mock_instance._call_with_retry = MagicMock(side_effect=mock_embed)
+        
+        service = EmbeddingService()
+        embeddings = service.generate_embeddings(["Google", "AI", "Google"])
+        assert len(embeddings) == 3
+        assert all(e is not None for e in embeddings)
+        assert mock_instance._call_with_retry.call_count == 1
+        assert sorted(mock_instance._call_with_retry.call_args.kwargs['content']) == ["AI", "Google"]
+        
+        # Second call is served from the cache
+        embeddings = service.generate_embeddings(["AI", "Google"])
+        assert all(e is not None for e in embeddings)
+        assert mock_instance._call_with_retry.call_count == 1
+
+def test_cache_hits_survive_concurrent_eviction():
+    """Test that a cache hit stays in the result even if evicted while other texts are embedded."""
+    with patch('app.features.organize.services.embedding_service.GeminiClient') as MockClient:
+        mock_instance = MockClient.return_value
+        mock_instance.model = MagicMock()
+        service = EmbeddingService()
+        
+        mock_instance._call_with_retry = MagicMock(return_value=[[0.1] * 768])
+        service.generate_embeddings(["AI"])
+        
+        def evict_and_embed(*args, **kwargs):
+            # Another request evicts everything while this batch is in flight
+            service._cache.clear()
+            return [[0.2] * 768 for _ in kwargs['content']]
+        
+        mock_instance._call_with_retry = MagicMock(side_effect=evict_and_embed)
+        embeddings = service.generate_embeddings(["AI", "ML"])
+        
+        assert all(e is not None for e in embeddings)
+        assert mock_instance._call_with_retry.call_args.kwargs['content'] == ["ML"]
+
+def test_cached_embeddings_match_fresh_embeddings():
+    """Test that a cache hit returns exactly the vector a fresh request did."""
+    vector = [float(i % 7) - 3.0 for i in range(768)]
+    
+    with patch('app.features.organize.services.embedding_service.GeminiClient') as MockClient:
+        mock_instance = MockClient.return_value
+        mock_instance.model = MagicMock()
+        mock_instance._call_with_retry = MagicMock(return_value=[vector])
+        
+        service = EmbeddingService()
+        fresh = service.generate_embeddings(["AI"])[0]
+        cached = service.generate_embeddings(["AI"])[0]
+        
+        assert mock_instance._call_with_retry.call_count == 1
+        assert next(iter(service._cache.values())).dtype == np.float32
+        assert cached == fresh
+
 def test_validate_embedding():
     """Test embedding validation."""
     with patch('app.features.organize.services.embedding_service.GeminiClient'):
@@ -1,4 +1,6 @@
 import pytest
+from unittest.mock import patch
+from app.features.organize.services import entity_extractor
 from app.features.organize.services.entity_extractor import extract_entities_spacy
 from app.features.organize.schemas.extract import ExtractedEntity
 
@@ -63,3 +65,18 @@ def test_extract_entities_deduplication_in_chunk():
     assert len([e for e in entities if e.name == "Paris"]) == 1
     # Should have 2 sources (or 1 if logic merges sources too, but current logic appends)
     assert len(paris.sources) == 2
+
+def test_extract_entities_spacy_caches_chunks():
+    """Verify repeated chunks only go through the spaCy pipeline once."""
+    chunk = "Bill Gates founded Microsoft in California."
+    expected = extract_entities_spacy([chunk], "test_cache_warm")
+    
+    with patch.object(entity_extractor, "run_ner_batch", wraps=entity_extractor.run_ner_batch) as mock_run:
+        entities = extract_entities_spacy([chunk, "Paris in 2024.", chunk], "test_cache")
+        
+        # Only the new chunk is processed
+        mock_run.assert_called_once_with(["Paris in 2024."])
+    
+    gates = next(e for e in entities if e.name == "Bill Gates")
+    assert gates.type == next(e for e in expected if e.name == "Bill Gates").type
+    assert [s.chunkIndex for s in gates.sources] == [0, 2]
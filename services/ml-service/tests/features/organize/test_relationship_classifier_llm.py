@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest.mock import Mock, MagicMock
 from app.features.organize.services.relationship_classifier import RelationshipClassifier
@@ -81,3 +82,62 @@ class TestRelationshipClassifierLLM:
         # Verify it didn't crash and kept original values
         assert len(result) == 1
         assert result[0].relationType == "related_to"
+
+    def test_classify_relationships_with_llm_caches_classifications(self, classifier, mock_gemini):
+        def make_relationship():
+            return ExtractedRelationship(
+                sourceEntity="Elon Musk",
+                targetEntity="Tesla",
+                type="cooccurrence",
+                relationType="related_to",
+                weight=0.8,
+                confidence=0.7,
+                examples=["Elon Musk is the CEO of Tesla."]
+            )
+
+        mock_gemini.classify_relationship.return_value = {
+            "type": "ceo_of",
+            "confidence": 0.9
+        }
+
+        first = classifier.classify_relationships_with_llm([make_relationship()], mock_gemini)
+        second = classifier.classify_relationships_with_llm([make_relationship()], mock_gemini)
+
+        # Second run is served from the cache
+        mock_gemini.classify_relationship.assert_called_once()
+        assert first[0].relationType == second[0].relationType == "ceo_of"
+        assert second[0].confidence == 0.9
+        assert classifier.llm_cache_stats()["hits"] == 1
+        assert classifier.llm_cache_stats()["hit_rate"] == 0.5
+
+    def test_classify_relationships_with_llm_async(self, classifier, mock_gemini):
+        relationships = [
+            ExtractedRelationship(
+                sourceEntity=f"Person {i}",
+                targetEntity="Acme",
+                type="cooccurrence",
+                relationType="related_to",
+                weight=0.8 if i < 5 else 0.2,
+                confidence=0.7,
+                examples=[f"Person {i} and Acme."]
+            )
+            for i in range(6)
+        ]
+
+        mock_gemini.classify_relationships_batch_async.side_effect = lambda pairs: [
+            {"type": "works_at", "confidence": 0.9} for _ in pairs
+        ]
+
+        result = asyncio.run(
+            classifier.classify_relationships_with_llm_async(
+                relationships, mock_gemini, max_concurrency=2, batch_size=2
+            )
+        )
+
+        # Order is preserved and only strong relationships are classified, two per call
+        assert [r.sourceEntity for r in result] == [f"Person {i}" for i in range(6)]
+        assert mock_gemini.classify_relationships_batch_async.await_count == 3
+        assert sum(len(c.args[0]) for c in mock_gemini.classify_relationships_batch_async.await_args_list) == 5
+        mock_gemini.classify_relationship.assert_not_called()
+        assert all(r.relationType == "works_at" for r in result[:5])
+        assert result[5].relationType == "related_to"
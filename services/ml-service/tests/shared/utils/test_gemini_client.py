@@ -1,8 +1,22 @@
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch
-from app.shared.utils.gemini_client import GeminiClient
+from unittest.mock import AsyncMock, MagicMock, patch
+import google.generativeai as genai
+from app.shared.utils.gemini_client import (
+    RELATIONSHIP_BATCH_CONFIG, RELATIONSHIP_CONFIG, RELATIONSHIP_TYPE_LINES, TYPE_PAIR_SUGGESTIONS, CircuitBreaker, CircuitOpenError, GeminiClient, RateLimiter,
+    gemini_breaker, gemini_limiter, max_concurrent_calls, select_snippets
+)
 from google.api_core import exceptions
 
+@pytest.fixture(autouse=True)
+def reset_breaker():
+    """Each test starts with the shared circuit breaker closed and rate limiter full."""
+    gemini_breaker.reset()
+    gemini_limiter.reset()
+    yield
+    gemini_breaker.reset()
+    gemini_limiter.reset()
+
 def test_gemini_client_init_no_key():
     """Verify initialization handles missing API key gracefully."""
     with patch.dict('os.environ', {}, clear=True):
@@ -48,5 +62,221 @@ def test_call_with_retry_max_retries():
     with patch('time.sleep'):
         with pytest.raises(Exception) as excinfo:
             client._call_with_retry(mock_func)
-        assert "failed after 3 retries" in str(excinfo.value)
-        assert mock_func.call_count == 3
+        assert "failed after 5 retries" in str(excinfo.value)
+        assert mock_func.call_count == 5
+
+def test_classify_relationships_batch():
+    """Verify batched classification scatters results back by pair id."""
+    client = GeminiClient(api_key="test")
+    client.model = MagicMock()
+    client.model.generate_content.return_value = MagicMock(
+        text='[{"id": 1, "type": "CEO_OF", "confidence": 0.9}, {"id": 0, "type": "founded", "confidence": 0.8}]'
+    )
+    
+    pairs = [
+        ("Elon Musk", "SpaceX", ["Elon Musk founded SpaceX."], "PERSON", "ORGANIZATION"),
+        ("Elon Musk", "Tesla", ["Elon Musk is the CEO of Tesla."], "PERSON", "ORGANIZATION"),
+        ("Tesla", "Austin", ["Tesla and Austin."], None, None)
+    ]
+    results = client.classify_relationships_batch(pairs)
+    
+    assert client.model.generate_content.call_count == 1
+    assert results[0] == {"type": "founded", "confidence": 0.8}
+    assert results[1] == {"type": "ceo_of", "confidence": 0.9}
+    # Pairs missing from the response get the default
+    assert results[2] == {"type": "related_to", "confidence": 0.5}
+
+def test_relationship_batch_prompt_uses_type_specific_menus():
+    """Verify known type pairs get their own menu and the full guide is only sent when needed."""
+    client = GeminiClient(api_key="test")
+    known = ("Tesla", "Austin", ["Tesla is based in Austin."], "ORGANIZATION", "LOCATION")
+    unknown = ("Tesla", "Austin", ["Tesla and Austin."], None, None)
+    
+    prompt = client._relationship_batch_prompt([known])
+    assert '"types":["founded","located_in","headquartered_in","related_to"]' in prompt
+    assert "- born_in" not in prompt
+    
+    prompt = client._relationship_batch_prompt([known, unknown])
+    assert "- born_in" in prompt
+    assert "each other relationship" in prompt
+
+def test_type_pair_menus_only_offer_guide_types():
+    """Verify every type-specific menu is a subset of the relationship types guide."""
+    client = GeminiClient(api_key="test")
+    
+    for source_type, target_type in TYPE_PAIR_SUGGESTIONS:
+        menu = client._suggested_types(source_type, target_type)
+        assert menu and set(menu) <= set(RELATIONSHIP_TYPE_LINES)
+    
+    assert "studied_at" in client._suggested_types("PERSON", "ORGANIZATION")
+
+def test_relationship_configs_accepted_by_sdk():
+    """Verify the pinned SDK's real request builder accepts the relationship generation configs."""
+    model = genai.GenerativeModel("gemini-pro")
+    
+    request = model._prepare_request(contents="Classify these pairs.", generation_config=RELATIONSHIP_BATCH_CONFIG)
+    assert request.generation_config.temperature == 0
+    
+    request = model._prepare_request(contents="Classify this pair.", generation_config=RELATIONSHIP_CONFIG)
+    assert request.generation_config.max_output_tokens == 64
+
+def test_classify_relationship_retries_mid_stream_failure():
+    """Verify an error raised while reading the stream is retried and counted by the breaker."""
+    def failing_stream():
+        yield MagicMock(text='{"type": "USES",')
+        raise exceptions.ServiceUnavailable("Stream dropped")
+    
+    client = GeminiClient(api_key="test")
+    client.model = MagicMock()
+    client.model.generate_content.side_effect = [
+        failing_stream(),
+        iter([MagicMock(text='```json\n{"type": "USES", "confidence": 0.7}'), MagicMock(text='\n```')])
+    ]
+    
+    with patch.object(gemini_breaker, 'record_failure', wraps=gemini_breaker.record_failure) as record_failure:
+        with patch('time.sleep'):
+            result = client.classify_relationship("Netflix", "Python", ["Netflix uses Python."])
+    
+    assert result == {"type": "uses", "confidence": 0.7}
+    assert client.model.generate_content.call_count == 2
+    record_failure.assert_called_once()
+
+def test_classify_relationships_batch_strips_fences():
+    """Verify a batch response wrapped in markdown fences is still parsed."""
+    client = GeminiClient(api_key="test")
+    client.model = MagicMock()
+    client.model.generate_content.return_value = MagicMock(
+        text='```json\n[{"id": 0, "type": "uses", "confidence": 0.7}]\n```'
+    )
+    
+    results = client.classify_relationships_batch([("Netflix", "Python", ["Netflix uses Python."], None, None)])
+    assert results == [{"type": "uses", "confidence": 0.7}]
+
+def test_call_with_retry_async_fail_then_success():
+    """Verify async retry logic handles transient errors."""
+    client = GeminiClient(api_key="test")
+    mock_func = AsyncMock(side_effect=[
+        exceptions.ServiceUnavailable("Down"),
+        "success"
+    ])
+    
+    with patch('asyncio.sleep', new=AsyncMock()):
+        result = asyncio.run(client._call_with_retry_async(mock_func))
+        assert result == "success"
+        assert mock_func.await_count == 2
+
+def test_max_concurrent_calls():
+    """Verify concurrency covers the request quota at the expected latency."""
+    assert max_concurrent_calls(rpm=120, latency_s=2.0) == 4
+    assert max_concurrent_calls(rpm=10, latency_s=1.0) == 1
+
+def test_retry_uses_server_retry_delay():
+    """Verify the delay from a Retry-After header is honored."""
+    client = GeminiClient(api_key="test")
+    error = exceptions.ResourceExhausted("Rate limit", response=MagicMock(headers={"Retry-After": "7"}))
+    mock_func = MagicMock(side_effect=[error, "success"])
+    
+    with patch('time.sleep') as mock_sleep:
+        assert client._call_with_retry(mock_func) == "success"
+        # (later sleeps, if any, are rate limiter pacing while time.sleep is mocked)
+        assert mock_sleep.call_args_list[0].args == (7.0,)
+
+def test_select_snippets_dedups_and_caps():
+    """Verify repeated snippets are sent once and the token budget is respected."""
+    snippets = ["Nike signed Jordan.", "nike signed jordan", "Jordan wore Nike.", "word " * 50]
+    assert select_snippets(snippets) == ["Nike signed Jordan.", "Jordan wore Nike.", "word " * 50]
+    assert select_snippets(snippets, token_budget=10) == ["Nike signed Jordan.", "Jordan wore Nike."]
+    assert select_snippets(snippets, max_snippets=1) == ["Nike signed Jordan."]
+
+def test_classify_relationship_uses_type_specific_menu():
+    """Verify a known type pair is prompted with its suggested types only."""
+    client = GeminiClient(api_key="test")
+    client.model = MagicMock()
+    client.model.generate_content.return_value = iter([MagicMock(text='{"type": "located_in", "confidence": 0.9}')])
+    
+    result = client.classify_relationship("Tesla", "Austin", ["Tesla is based in Austin."], "LOCATION", "ORGANIZATION")
+    prompt = client.model.generate_content.call_args.args[0]
+    
+    assert result == {"type": "located_in", "confidence": 0.9}
+    assert "- headquartered_in" in prompt and "- related_to" in prompt
+    assert "- born_in" not in prompt
+
+def test_gemini_clients_share_model():
+    """Verify clients with the same key reuse one GenerativeModel."""
+    with patch('google.generativeai.GenerativeModel') as mock_model:
+        first = GeminiClient(api_key="shared_key")
+        second = GeminiClient(api_key="shared_key")
+        
+        assert first.model is second.model
+        assert mock_model.call_count == 1
+
+def test_classify_relationship_stops_reading_stream_early():
+    """Verify the streamed response is parsed once the JSON object is complete."""
+    client = GeminiClient(api_key="test")
+    client.model = MagicMock()
+    chunks = iter([MagicMock(text='{"type": "USES",'), MagicMock(text=' "confidence": 0.7}'), MagicMock(text='\n\nExtra text')])
+    client.model.generate_content.return_value = chunks
+    
+    result = client.classify_relationship("Netflix", "Python", ["Netflix uses Python."])
+    
+    assert result == {"type": "uses", "confidence": 0.7}
+    assert client.model.generate_content.call_args.kwargs["stream"] is True
+    # The trailing chunk was never read
+    assert next(chunks).text == '\n\nExtra text'
+
+def test_call_with_retry_fails_fast_when_circuit_open():
+    """Verify calls are refused without reaching Gemini once the circuit opens."""
+    client = GeminiClient(api_key="test")
+    mock_func = MagicMock(side_effect=exceptions.ServiceUnavailable("Down"))
+    
+    with patch('time.sleep'):
+        with pytest.raises(Exception):
+            client._call_with_retry(mock_func)
+    assert gemini_breaker.state == "open"
+    
+    with pytest.raises(CircuitOpenError):
+        client._call_with_retry(mock_func)
+    assert mock_func.call_count == 5
+
+def test_rate_limit_burst_does_not_open_circuit():
+    """Verify 429s that succeed on retry do not count toward opening the circuit."""
+    client = GeminiClient(api_key="test")
+    
+    mock_func = MagicMock(side_effect=[exceptions.ResourceExhausted("Quota")] * 4 + ["Success"])
+    
+    with patch('time.sleep'), patch.object(gemini_breaker, "fail_max", 2):
+        assert client._call_with_retry(mock_func) == "Success"
+        assert gemini_breaker.state == "closed"
+    assert mock_func.call_count == 5
+
+def test_circuit_breaker_half_open_probe():
+    """Verify one probe is let through after the reset timeout, and success closes the circuit."""
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=10.0)
+    
+    with patch('time.monotonic', return_value=100.0):
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        breaker.record_failure()
+        assert breaker.state == "open"
+        assert not breaker.allow()
+    
+    with patch('time.monotonic', return_value=111.0):
+        assert breaker.state == "half_open"
+        assert breaker.allow()
+        assert not breaker.allow()  # Only one probe at a time
+        breaker.record_success()
+        assert breaker.state == "closed"
+
+def test_rate_limiter_paces_calls():
+    """Verify calls beyond the burst wait for the bucket to refill."""
+    with patch('time.monotonic', return_value=50.0):
+        limiter = RateLimiter(rate_per_minute=60, capacity=2)
+        
+        with patch('time.sleep') as mock_sleep:
+            limiter.acquire()
+            limiter.acquire()
+            mock_sleep.assert_not_called()
+            limiter.acquire()
+            limiter.acquire()
+            # One token per second: the 3rd call waits 1s, the 4th 2s
+            assert [c.args[0] for c in mock_sleep.call_args_list] == [1.0, 2.0]
@@ -3,6 +3,8 @@ from app.shared.utils.similarity import (
     normalize_text,
     string_similarity,
     cosine_similarity,
+    cosine_similarity_matrix,
+    build_embedding_matrix,
     is_abbreviation
 )
 
@@ -41,6 +43,11 @@ def test_string_similarity_partial():
     sim = string_similarity("Artificial Intelligence", "Artificial")
     assert 0.5 < sim < 1.0  # Partial match
 
+def test_string_similarity_score_cutoff():
+    """Test that scores below the cutoff come back as 0."""
+    assert string_similarity("Artificial Intelligence", "Artificial", score_cutoff=0.85) == 0.0
+    assert string_similarity("AI", "A.I.", score_cutoff=0.85) == 1.0
+
 # Test cosine_similarity
 def test_cosine_similarity_identical():
     """Test cosine similarity of identical vectors."""
@@ -75,6 +82,22 @@ def test_cosine_similarity_zero_vector():
     """Test zero vector handling."""
     assert cosine_similarity([0, 0], [1, 1]) == 0.0
 
+def test_cosine_similarity_matrix():
+    """Test similarity of one vector against many rows."""
+    sims = cosine_similarity_matrix([1, 0], [[1, 0], [0, 1], [-2, 0], [0, 0], [1.1, 0.9]])
+    assert sims.shape == (5,)
+    assert sims[:4].tolist() == [1.0, 0.0, -1.0, 0.0]
+    assert abs(sims[4] - cosine_similarity([1, 0], [1.1, 0.9])) < 1e-6
+
+def test_build_embedding_matrix():
+    """Test rows are normalized so dot products are cosine similarities."""
+    matrix = build_embedding_matrix([[3, 4], [0, 0], [1, 1]])
+    assert matrix.dtype.name == "float32"
+    assert matrix.flags["C_CONTIGUOUS"]
+    assert matrix[0].tolist() == pytest.approx([0.6, 0.8])
+    assert matrix[1].tolist() == [0.0, 0.0]
+    assert float(matrix[0] @ matrix[2]) == pytest.approx(cosine_similarity([3, 4], [1, 1]))
+
 # Test is_abbreviation
 def test_is_abbreviation_true():
     """Test abbreviation detection."""
@@ -1,5 +1,5 @@
 import pytest
-from app.shared.utils.spacy_loader import get_nlp
+from app.shared.utils.spacy_loader import get_nlp, run_ner_batch
 
 def test_get_nlp_singleton():
     """Verify get_nlp returns the same instance on multiple calls."""
@@ -13,3 +13,10 @@ def test_get_nlp_singleton():
     # Verify it's the correct model
     assert nlp1.meta["lang"] == "en"
     assert nlp1.meta["name"] == "core_web_sm"
+
+def test_run_ner_batch_preserves_order():
+    """Verify run_ner_batch returns one doc per text, in order."""
+    texts = ["First text.", "Second text here.", "Third."]
+    docs = run_ner_batch(texts)
+    
+    assert [doc.text for doc in docs] == texts
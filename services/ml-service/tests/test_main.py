@@ -0,0 +1,12 @@
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+
+def test_startup_survives_missing_spacy_model():
+    """Verify the app still starts (and reports healthy) when the spaCy model cannot load."""
+    with patch("app.shared.utils.spacy_loader.get_nlp", side_effect=OSError("en_core_web_sm not found")):
+        with TestClient(app) as test_client:
+            response = test_client.get("/health")
+    
+    assert response.status_code == 200
+    assert response.json()["status"] == "ok"
@@ -1,11 +1,29 @@
+import os
 import spacy
 import sys
+from spacy.util import is_package
 
-try:
-    nlp = spacy.load("en_core_web_sm")
-    print("✅ spaCy model loaded successfully")
-    print(f"spaCy version: {spacy.__version__}")
-    print(f"Model path: {nlp.path}")
-except Exception as e:
-    print(f"❌ Failed to load spaCy model: {e}")
+# Report the components the ML service disables (SPACY_DISABLED_COMPONENTS)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "services", "ml-service"))
+from app.shared.utils.spacy_loader import DISABLED_COMPONENTS
+
+MODEL = "en_core_web_sm"
+
+# Checks the installed package's metadata only; pass --full to also load the pipeline
+if not is_package(MODEL):
+    print(f"❌ spaCy model '{MODEL}' is not installed (python -m spacy download {MODEL})")
     sys.exit(1)
+
+info = spacy.info(MODEL)
+print(f"✅ spaCy model {MODEL} {info['version']} is installed")
+print(f"spaCy version: {spacy.__version__}")
+print(f"Disabled components: {', '.join(DISABLED_COMPONENTS) or 'none'}")
+
+if "--full" in sys.argv[1:]:
+    try:
+        nlp = spacy.load(MODEL, disable=DISABLED_COMPONENTS)
+        print(f"Model path: {nlp.path}")
+        print(f"Pipeline: {', '.join(nlp.pipe_names)}")
+    except Exception as e:
+        print(f"❌ Failed to load spaCy model: {e}")
+        sys.exit(1)